@@ -13,3 +13,5 @@ from remake.context import setVerbose, unsetVerbose, isVerbose
 from remake.context import setDryRun, unsetDryRun, isDryRun
 from remake.context import setDevTest, unsetDevTest, isDevTest
 from remake.context import setClean, unsetClean, isClean
+from remake.context import setGraphCache, unsetGraphCache, isGraphCache
+from remake.context import setJobs, getJobs
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Content-addressed cache of build artifacts for ReMake."""
+
+import hashlib
+import json
+import marshal
+import os
+import pathlib
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from remake.paths import VirtualDep, fastCopy
+
+# Files modified this recently (ns) may still change within the same timestamp, their digest is not stored.
+RACY_DELAY = 2 * 10**9
+
+
+def getCacheDir() -> pathlib.Path:
+    """Returns the root folder of ReMake caches.
+    Uses $REMAKE_CACHE_DIR if set, $XDG_CACHE_HOME/remake or ~/.cache/remake otherwise."""
+    if os.environ.get("REMAKE_CACHE_DIR"):
+        return pathlib.Path(os.environ["REMAKE_CACHE_DIR"])
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return pathlib.Path(base) / "remake"
+
+
+def fileDigest(path: pathlib.Path | str) -> bytes:
+    """Returns the sha256 digest of a file content."""
+    with open(path, "rb") as handle:
+        return hashlib.file_digest(handle, "sha256").digest()
+
+
+class DigestCache():
+    """Persistent cache of file digests, keyed by path and stat signature (size, times, inode).
+    Unchanged files are not read again across invocations."""
+    def __init__(self, dbPath: pathlib.Path | str | None = None):
+        self._dbPath = pathlib.Path(dbPath) if dbPath is not None else getCacheDir() / "hashes.sqlite"
+        self._db = None
+        self._lock = threading.Lock()
+
+    @property
+    def dbPath(self) -> pathlib.Path:
+        """Returns the path of the database file."""
+        return self._dbPath
+
+    def _connect(self):
+        if self._db is None:
+            self._dbPath.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self._dbPath, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=OFF")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS digests "
+                "(path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, ctime INTEGER, ino INTEGER, digest BLOB)"
+            )
+        return self._db
+
+    def digest(self, path: pathlib.Path | str) -> bytes:
+        """Returns the sha256 digest of a file content, from the cache if the file did not change."""
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        signature = (st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino)
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT digest FROM digests WHERE path = ? AND size = ? AND mtime = ? AND ctime = ? AND ino = ?",
+                    (key,
+                     *signature),
+                ).fetchone()
+        except sqlite3.Error:
+            return fileDigest(key)
+        if row is not None:
+            return row[0]
+
+        digest = fileDigest(key)
+        if time.time_ns() - max(st.st_mtime_ns, st.st_ctime_ns) > RACY_DELAY:
+            try:
+                with self._lock:
+                    self._connect().execute(
+                        "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?)",
+                        (key,
+                         *signature,
+                         digest),
+                    )
+            except sqlite3.Error:
+                pass
+        return digest
+
+
+class BuildCache():
+    """Stores targets under a key derived from the action that made them and the content of its dependencies."""
+    def __init__(self, cacheDir: pathlib.Path | str | None = None):
+        self._cacheDir = pathlib.Path(cacheDir) if cacheDir is not None else getCacheDir() / "artifacts"
+
+    @property
+    def cacheDir(self) -> pathlib.Path:
+        """Returns the folder holding cached artifacts."""
+        return self._cacheDir
+
+    @staticmethod
+    def toolFingerprint(name: str) -> str:
+        """Returns a fingerprint of the installed executable name (path, size and modification time).
+        Upgrading a toolchain thus misses the cache."""
+        path = shutil.which(name)
+        if path is None:
+            return name
+        st = os.stat(path)
+        return f"{path}:{st.st_size}:{st.st_mtime_ns}"
+
+    @staticmethod
+    def functionFingerprint(function) -> str | None:
+        """Returns a fingerprint of a python function (qualified name and bytecode).
+        Returns None for callables without bytecode (e.g., partials)."""
+        code = getattr(function, "__code__", None)
+        if code is None:
+            return None
+        return f"{function.__module__}.{function.__qualname__}:{hashlib.sha256(marshal.dumps(code)).hexdigest()}"
+
+    @staticmethod
+    def key(action: list[str], deps: list) -> str | None:
+        """Returns the cache key of an action applied to deps.
+        Returns None if a dependency cannot be fingerprinted (e.g., a directory)."""
+        h = hashlib.sha256(json.dumps(action).encode("utf-8"))
+        for dep in deps:
+            h.update(b"\0")
+            if isinstance(dep, VirtualDep):
+                h.update(str(dep).encode("utf-8"))
+            elif os.path.isfile(dep):
+                h.update(getDigestCache().digest(dep))
+            else:
+                return None
+        return h.hexdigest()
+
+    def _entry(self, key: str) -> pathlib.Path:
+        """Returns the folder of key, sharded by its first two characters."""
+        return self._cacheDir / key[:2] / key[2:]
+
+    def get(self, key: str) -> pathlib.Path | None:
+        """Returns the folder of cached artifacts for key, None if key is not cached."""
+        entry = self._entry(key)
+        return entry if entry.is_dir() else None
+
+    def put(self, key: str, targets: list[pathlib.Path]) -> None:
+        """Stores targets under key. Only regular files are cached."""
+        if self.get(key) is not None or not all(os.path.isfile(target) for target in targets):
+            return
+
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmpDir = tempfile.mkdtemp(dir=entry.parent, prefix=".tmp-")
+        for i, target in enumerate(targets):
+            fastCopy(target, os.path.join(tmpDir, str(i)))
+        try:
+            os.rename(tmpDir, entry)
+        except OSError:
+            # Another build stored the same key meanwhile.
+            shutil.rmtree(tmpDir, ignore_errors=True)
+
+    def restore(self, key: str, targets: list[pathlib.Path]) -> bool:
+        """Copies cached artifacts of key to targets.
+        Returns True on cache hit, False else."""
+        entry = self.get(key)
+        if entry is None or not all((entry / str(i)).is_file() for i in range(len(targets))):
+            return False
+
+        # Copies are reflinks on CoW filesystems. Hard links would let edits of a target corrupt the cache.
+        for i, target in enumerate(targets):
+            fastCopy(entry / str(i), target)
+        return True
+
+
+BUILD_CACHE = None
+
+
+def getBuildCache() -> BuildCache:
+    """Returns the build cache shared by all rules."""
+    global BUILD_CACHE
+    if BUILD_CACHE is None or BUILD_CACHE.cacheDir.parent != getCacheDir():
+        BUILD_CACHE = BuildCache()
+    return BUILD_CACHE
+
+
+DIGEST_CACHE = None
+
+
+def getDigestCache() -> DigestCache:
+    """Returns the digest cache shared by all rules."""
+    global DIGEST_CACHE
+    if DIGEST_CACHE is None or DIGEST_CACHE.dbPath.parent != getCacheDir():
+        DIGEST_CACHE = DigestCache()
+    return DIGEST_CACHE
@@ -2,27 +2,38 @@
 # -*- coding: utf-8 -*-
 """Default builders for ReMake."""
 
+import collections
+import functools
 import pathlib
 import os
 import shutil
+import stat
 import subprocess
-import tarfile
 import zipfile
 
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
-from typeguard import typechecked
 
+from remake.buildcache import fileDigest
 from remake.context import getCurrentContext
 from remake.paths import VirtualTarget, VirtualDep, GlobPattern, shouldRebuild
+from remake.paths import isFile, isDir, exists, invalidateStat, fastCopy, fastCopyAt, walk
+from remake.process import run, popen
+from remake.typecheck import typechecked
 
 
 @typechecked()
 class Builder():
-    """Generic builder class."""
-    _action = None
-    _shouldRebuild = None
-    _destructive = None
+    """Generic builder class.
+    Instantiating it returns a builder specialized for the kind of action (shell command or python function),
+    subclasses handle both kinds with the generic methods below."""
+    __slots__ = ("_action", "_type", "_hash", "_shouldRebuild", "_destructive", "_cacheable")
+
+    def __new__(cls, action=None, *_, **_2):
+        if cls is Builder:
+            cls = _CallableActionBuilder if callable(action) else _ListActionBuilder
+        return super().__new__(cls)
 
     def __init__(
         self,
@@ -35,28 +46,50 @@ class Builder():
                                     list[VirtualDep | pathlib.Path]],
                                    bool] | None = None,
         destructive: bool = False,
+        cacheable: bool = False,
     ):
-        if isinstance(action, str):
-            self._action = action.split(" ")
-        else:
-            self._action = action
+        self._action = action
+        self._prepare()
         self._shouldRebuild = shouldRebuildFun
         self._destructive = destructive
+        self._cacheable = cacheable and not destructive
         if not ephemeral:
             self._register()
 
     def __eq__(self, other):
-        return self._action == other._action
+        return self._action is other._action or (self._hash == other._hash and self._action == other._action)
 
     def __hash__(self):
-        if isinstance(self._action, list):
-            return hash(tuple(self._action))  # Hash based on list action
+        return self._hash
+
+    def __getstate__(self):
+        # Hashes of strings and ids of functions differ between processes, types of functions cannot be pickled.
+        return {
+            name: getattr(self, name)
+            for name in ("_action", "_shouldRebuild", "_destructive", "_cacheable")
+        }
 
-        return hash(id(self._action))  # Hash based on function
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._prepare()
 
     def _register(self) -> None:
         getCurrentContext().addBuilder(self)
 
+    def _prepare(self) -> None:
+        """Normalizes the action and precomputes what depends only on it (type, hash, etc)."""
+        if callable(self._action):
+            self._type = type(self._action)
+            self._hash = hash(id(self._action))  # Hash based on function
+        else:
+            action = self._action.split(" ") if isinstance(self._action, str) else self._action
+            # Identical commands share the same immutable action.
+            action = tuple(action)
+            self._action = _ACTION_INTERN.setdefault(action, action)
+            self._type = list
+            self._hash = hash(self._action)  # Hash based on list action
+
     def parseAction(
         self,
         deps: list[VirtualDep | pathlib.Path | GlobPattern],
@@ -66,32 +99,19 @@ class Builder():
                                Console],
                               None]:
         """Parses builder action for automatic variables ($@, etc)."""
-        def _replace_in_action(llist, pattern, repl):
-            try:
-                i = llist.index(pattern)
-            except ValueError:
-                return llist
-            return llist[:i] + repl + llist[i + 1:]
-
-        if isinstance(self._action, list):
-            ret = self._action
-            ret = _replace_in_action(ret, "$@", targets)
-            if deps:
-                ret = _replace_in_action(ret, "$^", [deps[0]])
-                ret = _replace_in_action(ret, "$<", deps)
-            return ret
-
+        if self._type is list:
+            return _actionParser(self._action)(deps, targets)
         return self._action
 
     @property
-    def action(self) -> Callable[[list[str], list[str], Console], None]:
+    def action(self) -> tuple[str, ...] | Callable[[list[str], list[str], Console], None]:
         """Returns builder's action."""
         return self._action
 
     @property
     def type(self):
         """Returns builder's action's type (list vs. callable)."""
-        return type(self._action)
+        return self._type
 
     @property
     def shouldRebuild(self):
@@ -103,25 +123,92 @@ class Builder():
         """Returns True if the builder is destructive (will remove target instead of creating it)."""
         return self._destructive
 
+    @property
+    def isCacheable(self):
+        """Returns True if the targets made by the builder can be restored from the build cache."""
+        return self._cacheable
+
+
+# Actions of shell command builders, shared by all builders running the same command.
+_ACTION_INTERN: dict[tuple[str, ...], tuple[str, ...]] = {}
+# Expressions substituted to the first occurrence of automatic variables, which are kept as is without deps.
+_AUTO_VAR_EXPRS = {"$@": "*targets", "$^": "*(deps[:1] or ({0!r},))", "$<": "*(deps or ({0!r},))"}
+# Functions substituting automatic variables of actions, compiled once per action.
+_ACTION_PARSERS: dict[tuple[str, ...], Callable] = {}
+
+
+def _compileParser(action: tuple[str, ...]) -> Callable:
+    """Returns a function (deps, targets) -> action with automatic variables substituted.
+    The function is generated from the action so that parsing it is a single list display without branches."""
+    parts = []
+    seen = set()
+    for token in action:
+        if token in _AUTO_VAR_EXPRS and token not in seen:
+            seen.add(token)
+            parts += [_AUTO_VAR_EXPRS[token].format(token)]
+        else:
+            parts += [repr(token)]
+    return eval(f"lambda deps, targets: [{', '.join(parts)}]", {})
+
+
+def _actionParser(action: tuple[str, ...]) -> Callable:
+    """Returns the (cached) function substituting automatic variables of action."""
+    if action not in _ACTION_PARSERS:
+        _ACTION_PARSERS[action] = _compileParser(action)
+    return _ACTION_PARSERS[action]
+
+
+@typechecked()
+class _ListActionBuilder(Builder):
+    """Builder running a shell command."""
+    __slots__ = ("_parse",)
+
+    def _prepare(self) -> None:
+        super()._prepare()
+        self._parse = _actionParser(self._action)
+
+    def parseAction(
+        self,
+        deps: list[VirtualDep | pathlib.Path | GlobPattern],
+        targets: list[VirtualTarget | pathlib.Path | GlobPattern]
+    ) -> list[str]:
+        """Parses builder action for automatic variables ($@, etc)."""
+        return self._parse(deps, targets)
+
+
+@typechecked()
+class _CallableActionBuilder(Builder):
+    """Builder calling a python function."""
+    __slots__ = ()
+
+    def parseAction(
+        self,
+        deps: list[VirtualDep | pathlib.Path | GlobPattern],
+        targets: list[VirtualTarget | pathlib.Path | GlobPattern]
+    ) -> Callable[[list[str],
+                   list[str],
+                   Console],
+                  None]:
+        """Returns builder action, python functions get their arguments when called."""
+        return self._action
+
 
 # ==================================================
 # =              File Operations                   =
 # ==================================================
 
+TAR = shutil.which("tar")
+
 
 def _FILE_OPS_shouldRebuild(target, deps):
     if len(deps) > 1:
-        ret = False
-        for dep in deps:
-            ret = ret or shouldRebuild(target / dep.name, [dep])
-
-        return ret
+        return any(shouldRebuild(target / dep.name, [dep]) for dep in deps)
 
     dep = deps[0]
-    if (dep.is_file() and target.is_dir()) or (dep.is_dir() and target.is_file()):
+    if (isFile(dep) and isDir(target)) or (isDir(dep) and isFile(target)):
         return True
 
-    if target.is_dir():
+    if isDir(target):
         target = target / dep.name
 
     return shouldRebuild(target, [dep])
@@ -138,29 +225,113 @@ def _FILE_OPS_shouldRebuild(target, deps):
 #   - Multiple arguments where all but last are source:
 #       - last is the destination directory, must exists and everything is copied inside
 #   - In all cases, intermediate folders must exist.
+# Above this many files, copying them all through a single tar pipe is cheaper than one copy per file.
+TAR_PIPE_THRESHOLD = 64
+
+
+def _tarPipeCopy(parent, names, target):
+    """Copies files names from directory parent into directory target by piping tar into tar."""
+    create = popen(
+        [TAR, "-c", "-h", "-f", "-", "-C", str(parent)] + [f"./{name}" for name in names],
+        stdout=subprocess.PIPE,
+    )
+    extract = run(
+        [TAR, "-x", "-m", "-p", "--no-same-owner", "-f", "-", "-C", str(target)],
+        stdin=create.stdout,
+        check=False,
+    )
+    create.stdout.close()
+    if create.wait() != 0:
+        raise subprocess.CalledProcessError(create.returncode, create.args)
+    if extract.returncode != 0:
+        raise subprocess.CalledProcessError(extract.returncode, extract.args)
+
+
+@functools.cache
+def _copyPool():
+    """Returns the thread pool copying files (copies are I/O bound and release the GIL)."""
+    return ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4))
+
+
+# Directories of which _copyTree copies files at the same time, each holding two open fds.
+COPY_TREE_OPEN_DIRS = 64
+
+
+def _copyTreeWait(futures, fds):
+    """Waits for the copies of a directory's files, then closes the directory fds."""
+    try:
+        for future in futures:
+            future.result()
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+
+def _copyTree(src, dst):
+    """Same as shutil.copytree, copying files concurrently.
+    Files are opened from the directory fds given by os.fwalk, so that their whole path is not resolved again."""
+    os.makedirs(dst)
+    dirs = []
+    pending = collections.deque()
+    try:
+        for srcDir, dirNames, fileNames, srcDirFd in os.fwalk(src):
+            dstDir = os.path.normpath(os.path.join(dst, os.path.relpath(srcDir, src)))
+            if dirs:
+                os.mkdir(dstDir)
+            dirs += [(srcDir, dstDir)]
+            for name in dirNames:
+                # Links to directories are not walked by fwalk, copy what they point to as copytree does.
+                if stat.S_ISLNK(os.stat(name, dir_fd=srcDirFd, follow_symlinks=False).st_mode):
+                    _copyTree(os.path.realpath(os.path.join(srcDir, name)), os.path.join(dstDir, name))
+            if not fileNames:
+                continue
+
+            # The walk closes srcDirFd once done with the directory, copies keep their own fds.
+            fds = (os.dup(srcDirFd), os.open(dstDir, os.O_RDONLY | os.O_DIRECTORY))
+            pending.append(([_copyPool().submit(fastCopyAt, fds[0], fds[1], name) for name in fileNames], fds))
+            if len(pending) > COPY_TREE_OPEN_DIRS:
+                _copyTreeWait(*pending.popleft())
+    finally:
+        while pending:
+            _copyTreeWait(*pending.popleft())
+
+    # Permissions and times of directories, set last since copying files in them changes their times.
+    for srcDir, dstDir in reversed(dirs):
+        shutil.copystat(srcDir, dstDir)
+
+
 def _cp(deps, targets, _):
     assert len(targets) == 1
     target = targets[0]
 
-    if len(deps) == 1 and deps[0].is_dir() and target.exists() and not target.is_dir():
+    if len(deps) == 1 and isDir(deps[0]) and exists(target) and not isDir(target):
         raise ValueError
-    if len(deps) > 1 and not target.is_dir():
+    if len(deps) > 1 and not isDir(target):
         raise FileNotFoundError
 
     if len(deps) > 1:
+        parent = deps[0].parent
+        if TAR is not None and len(deps) > TAR_PIPE_THRESHOLD and all(isFile(dep) and dep.parent == parent for dep in deps):
+            # Many sibling files, batch them to amortize per file syscalls.
+            _tarPipeCopy(parent, [dep.name for dep in deps], target)
+            return
+
+        futures = []
         for dep in deps:
-            if dep.is_file():
-                shutil.copy(dep, target)
-            elif dep.is_dir():
-                shutil.copytree(dep, target / dep.name)
+            if isFile(dep):
+                futures += [_copyPool().submit(fastCopy, dep, target)]
+            elif isDir(dep):
+                _copyTree(dep, target / dep.name)
+        for future in futures:
+            future.result()
     else:
         dep = deps[0]
-        if dep.is_file():
-            shutil.copy(dep, target)
-        elif dep.is_dir() and target.is_dir():
-            shutil.copytree(dep, target / dep.name)
-        elif dep.is_dir() and not target.exists():
-            shutil.copytree(dep, target)
+        if isFile(dep):
+            fastCopy(dep, target)
+        elif isDir(dep) and isDir(target):
+            _copyTree(dep, target / dep.name)
+        elif isDir(dep) and not exists(target):
+            _copyTree(dep, target)
 
 cp = Builder(action=_cp, shouldRebuildFun=_FILE_OPS_shouldRebuild)
 
@@ -179,11 +350,12 @@ cp = Builder(action=_cp, shouldRebuildFun=_FILE_OPS_shouldRebuild)
 def _mv(deps, targets, _):
     # TODO Replace by copy then remove ?
     assert len(targets) == 1
-    if len(deps) > 1 and not targets[0].is_dir():
+    if len(deps) > 1 and not isDir(targets[0]):
         raise FileNotFoundError
 
     for dep in deps:
         shutil.move(dep, targets[0])
+        invalidateStat(dep)
 
 mv = Builder(action=_mv, shouldRebuildFun=_FILE_OPS_shouldRebuild)
 
@@ -192,7 +364,7 @@ def _FILE_OPS_rmShouldRebuild(target, _):
     if isinstance(target, VirtualTarget):
         return False
     else:
-        return target.exists()
+        return exists(target)
 
 
 # Expects:
@@ -202,9 +374,9 @@ def _FILE_OPS_rmShouldRebuild(target, _):
 #       - If the argument is a dir and exists -> Ok, but only if the recursive flag is set
 def _rm(deps, targets, _, recursive=None):
     for target in targets:
-        if target.is_file():
+        if isFile(target):
             target.unlink()
-        elif target.is_dir():
+        elif isDir(target):
             if recursive:
                 shutil.rmtree(target)
             else:
@@ -219,26 +391,195 @@ rm = Builder(action=_rm, shouldRebuildFun=_FILE_OPS_rmShouldRebuild, destructive
 # ==================================================
 
 
+# Multithreaded compressors, used in place of single threaded tarfile compression when installed.
+PARALLEL_COMPRESSORS = {
+    "gz": ["pigz", "-c"],
+    "bz2": ["pbzip2", "-c"],
+    "xz": ["xz", "-T0", "-c"],
+}
+
+
+def _parallelCompressor(compression):
+    """Returns the command line of an installed multithreaded compressor for compression, None if none."""
+    if compression not in PARALLEL_COMPRESSORS:
+        return None
+
+    command = PARALLEL_COMPRESSORS[compression]
+    executable = shutil.which(command[0])
+    return [executable] + command[1:] if executable is not None else None
+
+
+def _relativePath(path, cwd):
+    """Same as path.relative_to(cwd) but slicing strings, cwd being given with a trailing separator."""
+    path = os.fspath(path)
+    if path.startswith(cwd):
+        return path[len(cwd):]
+    if path == cwd[:-1]:
+        return "."
+    raise ValueError(f"{path} is not in the subpath of {cwd}")
+
+
+# Options of GNU tar selecting the compression program when no multithreaded one is installed.
+TAR_COMPRESSIONS = {"gz": "--gzip", "bz2": "--bzip2", "xz": "--xz"}
+
+
+@functools.cache
+def _gnuTar():
+    """Returns the path of GNU tar, None if tar is not installed or is another implementation."""
+    if TAR is None:
+        return None
+
+    try:
+        version = run([TAR, "--version"], capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return TAR if "GNU tar" in version else None
+
+
+def _gnuTarCreate(names, target, compression):
+    """Creates archive target from names (relative to current directory) with GNU tar."""
+    command = [_gnuTar(), "--create", f"--file={target}", "--sort=name"]
+    compressor = _parallelCompressor(compression)
+    if compressor is not None:
+        command += [f"--use-compress-program={' '.join(compressor[:-1])}"]
+    elif compression in TAR_COMPRESSIONS:
+        command += [TAR_COMPRESSIONS[compression]]
+    # Names are given on stdin, so that they are neither limited in number nor parsed as options.
+    command += ["--null", "--verbatim-files-from", "--files-from=-"]
+    try:
+        run(command, input="\0".join(names).encode("utf-8"), check=True)
+    except subprocess.CalledProcessError:
+        if os.path.exists(target):
+            os.remove(target)
+        raise
+
+
+# Size of the buffers of the tarfile fallback, instead of tarfile's 10 KiB records and 16 KiB copies.
+TAR_BUFSIZE = 1 << 20
+
+
+def _tarAdd(tar, path, arcname):
+    """Same as tar.add(path, arcname) (recursive, sorted), with a single lstat per entry and unbuffered reads."""
+    info = tar.gettarinfo(path, arcname)
+    if info is None:
+        # Sockets and the like, skipped by tar.add too.
+        return
+
+    if info.isreg():
+        with open(path, "rb", buffering=0) as handle:
+            tar.addfile(info, handle)
+    else:
+        tar.addfile(info)
+    if info.isdir():
+        for name in sorted(os.listdir(path)):
+            _tarAdd(tar, os.path.join(path, name), os.path.join(arcname, name))
+
+
+def _tarOpen(**kwargs):
+    """Opens an archive for the tarfile fallback, with TAR_BUFSIZE buffers."""
+    import tarfile
+    tar = tarfile.open(encoding="utf-8", bufsize=TAR_BUFSIZE, **kwargs)
+    tar.copybufsize = TAR_BUFSIZE
+    return tar
+
+
 def _tar(deps, targets, _, compression=""):
-    cwd = os.getcwd()
-    mode = f"w:{compression}" if compression in ("gz", "bz2", "xz") else "w"
-    with tarfile.open(targets[0], mode, encoding="utf-8") as tar:
-        for dep in deps:
-            tar.add(dep.relative_to(cwd))
+    cwd = os.path.join(os.getcwd(), "")
+    if _gnuTar() is not None:
+        _gnuTarCreate([_relativePath(dep, cwd) for dep in deps], targets[0], compression)
+        return
+
+    compressor = _parallelCompressor(compression)
+    if compressor is None:
+        mode = f"w:{compression}" if compression in ("gz", "bz2", "xz") else "w"
+        with _tarOpen(name=targets[0], mode=mode) as tar:
+            for dep in deps:
+                _tarAdd(tar, str(dep), _relativePath(dep, cwd))
+        return
+
+    # Stream the uncompressed archive to the compressor.
+    with open(targets[0], "wb") as handle:
+        proc = popen(compressor, stdin=subprocess.PIPE, stdout=handle)
+        try:
+            with _tarOpen(fileobj=proc.stdin, mode="w|") as tar:
+                for dep in deps:
+                    _tarAdd(tar, str(dep), _relativePath(dep, cwd))
+        finally:
+            proc.stdin.close()
+            proc.wait()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, compressor)
 
 tar = Builder(action=_tar)
 
 
+# Members already compressed, stored as is instead of being deflated again.
+COMPRESSED_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".gz", ".bz2", ".xz", ".zst", ".zip", ".mp4", ".webm", ".pdf")
+# Timestamp of all zip members, for reproducible archives.
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+# Members up to this size are read ahead by worker threads, larger ones are streamed by the writing thread.
+ZIP_READ_MAX_SIZE = 16 << 20
+
+
+@functools.cache
+def _zipReadPool():
+    """Returns the thread pool reading zip members ahead of the writing thread."""
+    return ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+
+def _zipRead(path):
+    """Returns the content of file path, None if path is not a small enough file to be read ahead."""
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size > ZIP_READ_MAX_SIZE:
+            return None
+        return handle.read()
+
+
+def _zipReadAll(paths):
+    """Yields (path, _zipRead(path)) for all paths in order, reading a bounded number of them ahead."""
+    ahead = collections.deque()
+    for path in paths:
+        ahead.append((path, _zipReadPool().submit(_zipRead, path)))
+        if len(ahead) > 2 * (os.cpu_count() or 1):
+            path, future = ahead.popleft()
+            yield path, future.result()
+    while ahead:
+        path, future = ahead.popleft()
+        yield path, future.result()
+
+
+def _zipWrite(zip, path, arcname, data=None):
+    """Adds path to zip as arcname, with a fixed timestamp and deflated unless already compressed.
+    data is the content of path, if already read."""
+    info = zipfile.ZipInfo.from_file(path, arcname)
+    info.date_time = ZIP_DATE_TIME
+    if info.is_dir():
+        zip.mkdir(info)
+        return
+
+    info.compress_type = zipfile.ZIP_STORED if path.lower().endswith(COMPRESSED_SUFFIXES) else zipfile.ZIP_DEFLATED
+    if data is None:
+        with open(path, "rb") as src, zip.open(info, "w") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        return
+
+    zip.writestr(info, data)
+
+
 def _zip(deps, targets, _):
-    cwd = os.getcwd()
+    cwd = os.path.join(os.getcwd(), "")
+    paths = []
+    for dep in deps:
+        paths += sorted(walk(str(dep))) if dep.is_dir() else [str(dep)]
+
     with zipfile.ZipFile(targets[0], "w") as zip:
-        for dep in deps:
-            if dep.is_dir():
-                files = list(dep.rglob("*"))
-                for file in files:
-                    zip.write(file.relative_to(cwd))
-            else:
-                zip.write(dep.relative_to(cwd))
+        for path, data in _zipReadAll(paths):
+            _zipWrite(zip, path, _relativePath(path, cwd), data)
 
 zip = Builder(action=_zip)
 
@@ -247,12 +588,93 @@ zip = Builder(action=_zip)
 # ==================================================
 
 
-def _tex2pdf(deps, _, _2, cmd="pdflatex"):
-    latexFile = deps[0].replace(".tex", "")
-    subprocess.run([cmd, latexFile], check=True)
-    subprocess.run(["bibtex", latexFile], check=True)
-    subprocess.run([cmd, latexFile], check=True)
-    subprocess.run([cmd, latexFile], check=True)
+# Upper bound of LaTeX passes, in case cross-references never settle.
+TEX_MAX_PASSES = 4
+# Options of every LaTeX pass, intermediate passes also get -draftmode (no PDF written, images not read).
+TEX_PASS_OPTIONS = ["-interaction=batchmode", "-halt-on-error"]
+
+
+def _auxDigest(auxFile):
+    """Returns the digest of a LaTeX .aux file, None if it does not exist."""
+    return fileDigest(auxFile) if auxFile.is_file() else None
+
+
+def _texDigest(stem):
+    """Returns the digests of LaTeX files holding cross-references (.aux, .toc)."""
+    return tuple(_auxDigest(pathlib.Path(f"{stem}{suffix}")) for suffix in (".aux", ".toc"))
+
+
+def _auxBibLines(auxFile):
+    """Returns the bibliography related lines (citations, databases, style) of a LaTeX .aux file."""
+    if not auxFile.is_file():
+        return []
+
+    with open(auxFile, "r", encoding="utf-8", errors="replace") as handle:
+        return [line for line in handle if line.startswith(("\\citation", "\\bibdata", "\\bibstyle"))]
+
+
+def _needsBibtex(bblFile, bibLines, oldBibLines):
+    """Returns True if bibtex must be run to update bblFile."""
+    if not any(line.startswith("\\bibdata") for line in bibLines):
+        # Document has no bibliography.
+        return False
+
+    if not bblFile.is_file() or bibLines != oldBibLines:
+        return True
+
+    # Databases listed by \bibdata{a,b} are a.bib and b.bib.
+    for line in bibLines:
+        if line.startswith("\\bibdata{"):
+            for name in line.strip()[len("\\bibdata{"):-1].split(","):
+                bibFile = pathlib.Path(name if name.endswith(".bib") else f"{name}.bib")
+                if bibFile.is_file() and bibFile.stat().st_mtime > bblFile.stat().st_mtime:
+                    return True
+    return False
+
+
+# latexmk, running only the LaTeX and bibtex passes needed when installed.
+LATEXMK = shutil.which("latexmk")
+
+
+def _tex2pdf(deps, _, _2, cmd="pdflatex", useLatexmk=True):
+    texFile = pathlib.Path(deps[0])
+    latexFile = str(texFile.with_suffix(""))
+    if useLatexmk and LATEXMK is not None:
+        run([LATEXMK, "-pdf", f"-pdflatex={cmd} %O %S"] + TEX_PASS_OPTIONS + [latexFile], check=True)
+        return
+
+    # LaTeX outputs are written in the current directory.
+    auxFile = pathlib.Path(f"{texFile.stem}.aux")
+    bblFile = pathlib.Path(f"{texFile.stem}.bbl")
+
+    def _pass(draft):
+        run([cmd] + TEX_PASS_OPTIONS + (["-draftmode"] if draft else []) + [latexFile], check=True)
+
+    prev = _texDigest(texFile.stem)
+    oldBibLines = _auxBibLines(auxFile)
+    # Without previous .aux file, a second pass is always needed so the first one does not produce the PDF.
+    draft = prev[0] is None
+    _pass(draft)
+    passes = 1
+
+    ranBibtex = False
+    bibLines = _auxBibLines(auxFile)
+    if _needsBibtex(bblFile, bibLines, oldBibLines):
+        run(["bibtex", latexFile], check=True)
+        ranBibtex = True
+
+    # Rerun until cross-references reach a fixed point (unchanged by last pass), the last pass producing the PDF.
+    while passes < TEX_MAX_PASSES:
+        digest = _texDigest(texFile.stem)
+        stable = digest == prev and not ranBibtex
+        if stable and not draft:
+            break
+        prev = digest
+        # Citations from a new bibliography are only resolved by the pass after the next one.
+        draft = ranBibtex and passes < TEX_MAX_PASSES - 1
+        ranBibtex = False
+        _pass(draft)
+        passes += 1
 
 tex2pdf = Builder(action=_tex2pdf)
 
@@ -261,14 +683,24 @@ tex2pdf = Builder(action=_tex2pdf)
 # ==================================================
 
 
-def _gcc(_, targets, _2, cflags=""):
-    subprocess.run(["gcc", cflags, "-o", targets[0]], check=True)
+# ccache, reusing objects of identical compilations when installed.
+CCACHE = shutil.which("ccache")
+
+
+def _compile(compiler, deps, targets, cflags):
+    """Compiles deps into targets[0] with compiler, through ccache if installed."""
+    command = ([CCACHE] if CCACHE is not None else []) + [compiler]
+    run(command + cflags.split() + ["-o", str(targets[0])] + [str(dep) for dep in deps], check=True)
+
+
+def _gcc(deps, targets, _, cflags=""):
+    _compile("gcc", deps, targets, cflags)
 
 gcc = Builder(action=_gcc)
 
 
-def _clang(_, targets, _2, cflags=""):
-    subprocess.run(["clang", cflags, "-o", targets[0]], check=True)
+def _clang(deps, targets, _, cflags=""):
+    _compile("clang", deps, targets, cflags)
 
 clang = Builder(action=_clang)
 
@@ -281,4 +713,4 @@ html2pdf_chrome = Builder(
 )
 md2html = Builder(action="pandoc $^ -o $@")
 jinja2 = Builder(action="jinja2 $^ -o $@")
-pdfcrop = Builder(action="pdftk $^ cat 1 output $@")
+pdfcrop = Builder(action="pdftk $^ cat 1 output $@", cacheable=True)
@@ -2,94 +2,129 @@
 # -*- coding: utf-8 -*-
 """ReMake functions to handle contexts."""
 
-from collections import deque
-from typeguard import typechecked
+import hashlib
+import pickle
+
+from remake.typecheck import typechecked
+
+# Run modes, as bits of FLAGS.
+VERBOSE_BIT = 1
+DRY_RUN_BIT = 2
+DEV_TEST_BIT = 4
+CLEAN_BIT = 8
+GRAPH_CACHE_BIT = 16
+_FLAG_NAMES = {
+    "VERBOSE": VERBOSE_BIT,
+    "DRY_RUN": DRY_RUN_BIT,
+    "DEV_TEST": DEV_TEST_BIT,
+    "CLEAN": CLEAN_BIT,
+    "GRAPH_CACHE": GRAPH_CACHE_BIT,
+}
+FLAGS = 0
+JOBS = 1
+
+
+def __getattr__(name):
+    # Former module level booleans (VERBOSE, DRY_RUN, etc), now bits of FLAGS.
+    if name in _FLAG_NAMES:
+        return (FLAGS & _FLAG_NAMES[name]) != 0
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-VERBOSE = False
-DRY_RUN = False
-DEV_TEST = False
-CLEAN = False
 
-
-@typechecked()
 def isVerbose() -> bool:
     """Returns True if run is in verbose mode, False otherwise."""
-    return VERBOSE
+    return (FLAGS & VERBOSE_BIT) != 0
 
 
-@typechecked()
 def isDryRun() -> bool:
     """Returns True if run is in dry run mode, False otherwise."""
-    return DRY_RUN
+    return (FLAGS & DRY_RUN_BIT) != 0
 
 
-@typechecked()
 def isDevTest() -> bool:
     """Returns True if run is in development mode, False otherwise."""
-    return DEV_TEST
+    return (FLAGS & DEV_TEST_BIT) != 0
 
 
-@typechecked()
 def isClean() -> bool:
     """Returns True if run is in clean mode, False otherwise."""
-    return CLEAN
+    return (FLAGS & CLEAN_BIT) != 0
+
+
+def isGraphCache() -> bool:
+    """Returns True if evaluated ReMakeFiles are cached, False otherwise."""
+    return (FLAGS & GRAPH_CACHE_BIT) != 0
+
+
+def _setFlag(bit: int, on: bool) -> None:
+    """Sets (or unsets) the bit of a run mode."""
+    global FLAGS
+    FLAGS = FLAGS | bit if on else FLAGS & ~bit
 
 
-@typechecked()
 def setDryRun() -> None:
     """Sets run to dry run mode."""
-    global DRY_RUN
-    DRY_RUN = True
+    _setFlag(DRY_RUN_BIT, True)
 
 
-@typechecked()
 def setVerbose() -> None:
     """Sets run to verbose mode."""
-    global VERBOSE
-    VERBOSE = True
+    _setFlag(VERBOSE_BIT, True)
 
 
-@typechecked()
 def setDevTest() -> None:
     """Sets run to development mode."""
-    global DEV_TEST
-    DEV_TEST = True
+    _setFlag(DEV_TEST_BIT, True)
 
 
-@typechecked()
 def setClean() -> None:
     """Sets run to clean mode."""
-    global CLEAN
-    CLEAN = True
+    _setFlag(CLEAN_BIT, True)
+
+
+def setGraphCache() -> None:
+    """Sets run to cache evaluated ReMakeFiles."""
+    _setFlag(GRAPH_CACHE_BIT, True)
 
 
-@typechecked()
 def unsetDryRun() -> None:
     """Sets run to NOT dry run mode."""
-    global DRY_RUN
-    DRY_RUN = False
+    _setFlag(DRY_RUN_BIT, False)
 
 
-@typechecked()
 def unsetVerbose() -> None:
     """Sets run to NOT verbose mode."""
-    global VERBOSE
-    VERBOSE = False
+    _setFlag(VERBOSE_BIT, False)
 
 
-@typechecked()
 def unsetDevTest() -> None:
     """Sets run to NOT development mode."""
-    global DEV_TEST
-    DEV_TEST = False
+    _setFlag(DEV_TEST_BIT, False)
     resetOldContexts()
 
 
-@typechecked()
 def unsetClean() -> None:
     """Sets run to NOT clean mode."""
-    global CLEAN
-    CLEAN = False
+    _setFlag(CLEAN_BIT, False)
+
+
+def unsetGraphCache() -> None:
+    """Sets run to NOT cache evaluated ReMakeFiles."""
+    _setFlag(GRAPH_CACHE_BIT, False)
+
+
+def getJobs() -> int:
+    """Returns the number of rules that can be applied concurrently."""
+    return JOBS
+
+
+@typechecked()
+def setJobs(jobs: int) -> None:
+    """Sets the number of rules that can be applied concurrently."""
+    global JOBS
+    if jobs < 1:
+        raise ValueError(f"Number of jobs must be positive, got {jobs}")
+    JOBS = jobs
 
 
 def getOldContext(cwd):
@@ -104,48 +139,66 @@ def addOldContext(cwd, context):
 
 def resetOldContexts():
     """Empties old contexts."""
-    global DEV_OLD_CONTEXTS
-    DEV_OLD_CONTEXTS = {}
+    DEV_OLD_CONTEXTS.clear()
 
 
 def getCurrentContext():
     """Returns current context."""
-    return CONTEXTS[-1]
+    return CURRENT_CONTEXT
 
 
 def getContexts():
-    """Returns all paths from contexts."""
-    return CONTEXTS
+    """Returns all paths from contexts (as a read only snapshot)."""
+    return CONTEXTS_SNAPSHOT
 
 
 def addContext(cwd):
     """Adds a path to contexts."""
-    CONTEXTS.append(Context(cwd))
+    global CURRENT_CONTEXT, CONTEXTS_SNAPSHOT
+    CURRENT_CONTEXT = Context(cwd)
+    CONTEXTS.append(CURRENT_CONTEXT)
+    CONTEXTS_SNAPSHOT = tuple(CONTEXTS)
 
 
 def popContext():
     """Pops lats path from contexts."""
-    return CONTEXTS.pop()
+    global CURRENT_CONTEXT, CONTEXTS_SNAPSHOT
+    ret = CONTEXTS.pop()
+    CURRENT_CONTEXT = CONTEXTS[-1] if CONTEXTS else None
+    CONTEXTS_SNAPSHOT = tuple(CONTEXTS)
+    return ret
 
 
 class Context():
     """Class registering a context of execution (builders, rules, targets)."""
-    _cwd = None
-    _builders = None
-    _namedRules = None
-    _patternRules = None
-    _executedRules = None
-    _targets = None
-    _deps = None
+    __slots__ = (
+        "_cwd",
+        "_builders",
+        "_namedRules",
+        "_patternRules",
+        "_rules",
+        "_ruleIndex",
+        "_executedRules",
+        "_targets",
+        "_targetSet",
+        "_deps",
+        "_subDirs",
+    )
 
     def __init__(self, cwd):
         self._cwd = cwd
         self._builders = []
         self._namedRules = []
         self._patternRules = []
-        self._executedRules = []
+        # Rules lists are only appended to or replaced together, so the tuple returned by rules is built once.
+        self._rules = (self._namedRules, self._patternRules)
+        self._ruleIndex = None
+        # Only some contexts execute rules, add targets or sub directories, these are allocated when first needed.
+        self._executedRules = None
         self._targets = []
+        self._targetSet = None
         self._deps = None
+        self._subDirs = None
 
     @property
     def cwd(self):
@@ -154,13 +207,13 @@ class Context():
 
     def addTargets(self, targets):
         """Adds targets to current context."""
-        if isinstance(targets, list):
-            for target in targets:
-                if not target in self._targets:
-                    self._targets += [target]
-        else:
-            if not targets in self._targets:
-                self._targets += [targets]
+        # Membership is checked in a set, so that adding many targets is not quadratic.
+        if self._targetSet is None:
+            self._targetSet = set(self._targets)
+        for target in targets if isinstance(targets, (list, tuple)) else (targets,):
+            if not target in self._targetSet:
+                self._targetSet.add(target)
+                self._targets.append(target)
 
     @property
     def targets(self) -> list:
@@ -170,29 +223,44 @@ class Context():
     def clearTargets(self):
         """Clears list of targets of current context."""
         self._targets = []
+        self._targetSet = None
 
     def addNamedRule(self, rule):
         """Adds a named rule to current context."""
-        self._namedRules += [rule]
+        self._namedRules.append(rule)
+        self._ruleIndex = None
 
     def addPatternRule(self, rule):
         """Adds a pattern rule to current context."""
-        self._patternRules += [rule]
+        self._patternRules.append(rule)
+        self._ruleIndex = None
 
     @property
     def rules(self):
         """Returns the list of rules from current context."""
-        return (self._namedRules, self._patternRules)
+        return self._rules
 
     def clearRules(self):
         """Clears list of rules of current context."""
         self._namedRules = []
         self._patternRules = []
+        self._rules = (self._namedRules, self._patternRules)
+        self._ruleIndex = None
+
+    @property
+    def ruleIndex(self):
+        """Returns the lookup index of the rules of current context, None if rules changed since it was set."""
+        return self._ruleIndex
+
+    @ruleIndex.setter
+    def ruleIndex(self, index):
+        """Sets the lookup index of the rules of current context."""
+        self._ruleIndex = index
 
     @property
     def executedRules(self):
         """Returns the list of executed rules."""
-        return self._executedRules
+        return self._executedRules if self._executedRules is not None else []
 
     @executedRules.setter
     def executedRules(self, rules):
@@ -201,7 +269,7 @@ class Context():
 
     def addBuilder(self, builder):
         """Adds a builder to current context."""
-        self._builders += [builder]
+        self._builders.append(builder)
 
     @property
     def builders(self):
@@ -212,6 +280,32 @@ class Context():
         """Clears list of builders of current context."""
         self._builders = []
 
+    def prune(self):
+        """Drops builders that are not used by any rule of current context
+        (e.g., default builders registered when importing remake.builders)."""
+        used = {id(rule.builder) for rule in self._namedRules + self._patternRules}
+        self._builders = [builder for builder in self._builders if id(builder) in used]
+
+    def addSubDir(self, subDir):
+        """Adds a sub directory whose ReMakeFile was executed from current context."""
+        if self._subDirs is None:
+            self._subDirs = []
+        self._subDirs.append(subDir)
+
+    @property
+    def subDirs(self):
+        """Returns the list of sub directories whose ReMakeFile was executed from current context."""
+        return self._subDirs if self._subDirs is not None else []
+
+    def fingerprint(self) -> bytes | None:
+        """Returns a digest of the cwd, rules and targets of current context, the same across runs while they do not
+        change. Returns None if they cannot be pickled (e.g., builders calling functions defined in the ReMakeFile)."""
+        try:
+            data = pickle.dumps((self._cwd, self._namedRules, self._patternRules, self._targets))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return None
+        return hashlib.blake2b(data, digest_size=16).digest()
+
     @property
     def deps(self):
         """Returns dependencies to make target."""
@@ -223,6 +317,10 @@ class Context():
         self._deps = deps
 
 
-CONTEXTS = deque()
+CONTEXTS = []
 CONTEXTS.append(Context(None))
+# Last context of CONTEXTS, kept aside as it is looked up for every rule, builder and target registered.
+CURRENT_CONTEXT = CONTEXTS[-1]
+# Contexts as returned by getContexts, rebuilt when pushing or popping a context instead of when iterating them.
+CONTEXTS_SNAPSHOT = tuple(CONTEXTS)
 DEV_OLD_CONTEXTS = {}
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Cache of evaluated ReMakeFiles (builders, rules and targets) for ReMake."""
+
+import hashlib
+import os
+import pathlib
+import pickle
+import sys
+import sysconfig
+
+from remake.buildcache import getCacheDir, fileDigest
+from remake.context import getCurrentContext, getContexts
+
+GRAPH_CACHE_VERSION = 1
+
+
+def _graphPath(configFile: str):
+    """Returns the path of the cached graph of configFile from current directory."""
+    h = hashlib.sha256(os.getcwd().encode("utf-8"))
+    h.update(b"\0")
+    h.update(fileDigest(configFile))
+    return getCacheDir() / "graphs" / f"graph_{h.hexdigest()}.pkl"
+
+
+def importedModules() -> list[str]:
+    """Returns the source files of project modules currently imported, the ones a ReMakeFile may depend on.
+    Modules from the standard library and installed packages are ignored."""
+    ignoredPrefixes = tuple({sysconfig.get_path("stdlib"), sysconfig.get_path("purelib"), sysconfig.get_path("platlib")})
+    ret = []
+    for module in list(sys.modules.values()):
+        filename = getattr(module, "__file__", None)
+        if filename and filename.endswith(".py") and not filename.startswith(ignoredPrefixes):
+            if os.path.isfile(filename):
+                ret += [filename]
+    return sorted(set(ret))
+
+
+def loadGraph(configFile: str) -> bool:
+    """Restores builders, rules and targets of configFile into the current context.
+    Returns True if the cached graph was valid and restored, False else."""
+    path = _graphPath(configFile)
+    try:
+        with open(path, "rb") as handle:
+            cached = pickle.load(handle)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return False
+
+    if cached.get("version") != GRAPH_CACHE_VERSION:
+        return False
+
+    # Any change of an imported module invalidates the graph.
+    for filename, digest in cached["modules"].items():
+        try:
+            if fileDigest(filename) != digest:
+                return False
+        except OSError:
+            return False
+
+    context = getCurrentContext()
+    for builder in cached["builders"]:
+        context.addBuilder(builder)
+    for rule in cached["namedRules"]:
+        context.addNamedRule(rule)
+    for rule in cached["patternRules"]:
+        context.addPatternRule(rule)
+    context.addTargets(cached["targets"])
+    return True
+
+
+def saveGraph(configFile: str, modules: list[str]) -> None:
+    """Stores builders, rules and targets of the current context as the graph of configFile.
+    Contexts that cannot be pickled (e.g., builders calling functions defined in the ReMakeFile) are not stored."""
+    context = getCurrentContext()
+    namedRules, patternRules = context.rules
+    cached = {
+        "version": GRAPH_CACHE_VERSION,
+        "modules": {filename: fileDigest(filename) for filename in modules},
+        "builders": context.builders,
+        "namedRules": namedRules,
+        "patternRules": patternRules,
+        "targets": context.targets,
+    }
+    try:
+        data = pickle.dumps(cached)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return
+
+    path = _graphPath(configFile)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmpPath = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmpPath, "wb") as handle:
+        handle.write(data)
+    os.replace(tmpPath, path)
+
+
+def _depsPath(targets) -> pathlib.Path | None:
+    """Returns the path of the cached dependency list of targets from the rules of all current contexts,
+    None if they cannot be fingerprinted."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(GRAPH_CACHE_VERSION.to_bytes(4, "little"))
+    for context in getContexts():
+        fingerprint = context.fingerprint()
+        if fingerprint is None:
+            return None
+        h.update(fingerprint)
+    try:
+        h.update(pickle.dumps(targets))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return None
+    return getCacheDir() / "deps" / f"deps_{h.hexdigest()}.pkl"
+
+
+def loadDeps(targets):
+    """Returns the cached dependency list of targets, None if not cached or if a ground dependency disappeared."""
+    path = _depsPath(targets)
+    if path is None:
+        return None
+
+    try:
+        with open(path, "rb") as handle:
+            deps = pickle.load(handle)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+    # Ground dependencies are the only part of the list depending on the filesystem.
+    for depTargets, rule in deps:
+        if rule is None and any(isinstance(dep, pathlib.Path) and not os.path.exists(dep) for dep in depTargets):
+            return None
+    return deps
+
+
+def saveDeps(targets, deps) -> None:
+    """Stores the dependency list of targets from the rules of all current contexts."""
+    path = _depsPath(targets)
+    if path is None:
+        return
+
+    try:
+        data = pickle.dumps(deps)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmpPath = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmpPath, "wb") as handle:
+        handle.write(data)
+    os.replace(tmpPath, path)
@@ -2,25 +2,28 @@
 # -*- coding: utf-8 -*-
 """Main functions of ReMake."""
 
-import argparse
 import os
 import pathlib
 import re
 import shutil
+import stat
 import sys
 import json
+import types
 
-from collections import deque
-from itertools import chain
 from rich.progress import Progress
 from rich.console import Console
-from typeguard import typechecked
 from typing import Dict, List, Tuple, Union
 
 from remake.context import addContext, popContext, addOldContext, getCurrentContext, getContexts, Context
-from remake.context import isDryRun, isDevTest, isClean, setVerbose, setDryRun, setClean
+from remake.context import isDryRun, isDevTest, isClean, isVerbose, setVerbose, setDryRun, setClean, getJobs, setJobs
+from remake.context import isGraphCache, setGraphCache
+from remake.graphcache import loadGraph, saveGraph, importedModules, loadDeps, saveDeps
 from remake.paths import VirtualTarget, VirtualDep, TYP_PATH_LOOSE
-from remake.rules import TYP_DEP_LIST, TYP_DEP_GRAPH, PatternRule
+from remake.paths import absolutePath, cachedStat, clearStatCache, exists, invalidateStat
+from remake.rules import TYP_DEP_LIST, TYP_DEP_GRAPH, PatternRule, RuleIndex
+from remake.schedule import runJobs
+from remake.typecheck import typechecked
 
 from remake.builders import Builder  # Import needed to avoid imports in ReMakeFile
 from remake.rules import Rule  # Import needed to avoid imports in ReMakeFile
@@ -31,9 +34,11 @@ class AddTarget:
     """Class registering files as remake targets."""
     def __init__(self, targets: list[str | pathlib.Path] | str | pathlib.Path):
         if isinstance(targets, (str, pathlib.Path)):
-            getCurrentContext().addTargets(pathlib.Path(targets).absolute())
+            getCurrentContext().addTargets(absolutePath(targets))
         elif isinstance(targets, list):
-            getCurrentContext().addTargets([pathlib.Path(_).absolute() for _ in targets])
+            # Current directory is only read once for all targets.
+            cwd = os.getcwd()
+            getCurrentContext().addTargets([absolutePath(_, cwd) for _ in targets])
 
 
 @typechecked
@@ -48,6 +53,7 @@ def AddVirtualTarget(name: str) -> VirtualTarget:
 class SubReMakeDir:
     """Instantiate a sub context for a call to a sub ReMakeFile."""
     def __init__(self, subDir: str):
+        getCurrentContext().addSubDir(subDir)
         executeReMakeFileFromDirectory(subDir)
 
 
@@ -58,9 +64,9 @@ def executeReMakeFileFromDirectory(
     targets: list[TYP_PATH_LOOSE] | None = None
 ) -> Context:
     """Loads ReMakeFile from current directory in a new context and builds associated targets."""
-    absCwd = os.path.abspath(cwd)
-    addContext(absCwd)
     oldCwd = os.getcwd()
+    absCwd = os.path.normpath(os.path.join(oldCwd, cwd))
+    addContext(absCwd)
     os.chdir(absCwd)
 
     loadScript(configFile)
@@ -82,33 +88,115 @@ def executeReMakeFileFromDirectory(
     return oldContext
 
 
+# Compiled ReMakeFiles, by absolute path, modification time and size.
+SCRIPT_CACHE = {}
+
+
+def compileScript(configFile: str) -> types.CodeType:
+    """Returns the compiled code of the ReMakeFile, only compiled again when the file changed."""
+    path = os.path.abspath(configFile)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    try:
+        return SCRIPT_CACHE[key]
+    except KeyError:
+        pass
+
+    # Read raw bytes in one call instead of going through a text reader, compile decodes them (UTF-8 by default).
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        script = os.read(fd, st.st_size + 1)
+        while chunk := os.read(fd, 1 << 16):
+            script += chunk
+    finally:
+        os.close(fd)
+    ret = SCRIPT_CACHE[key] = compile(script, path, "exec")
+    return ret
+
+
 @typechecked
 def loadScript(configFile: str = "ReMakeFile") -> None:
-    """Loads and execs the ReMakeFile script."""
-    with open(configFile, "r", encoding="utf-8") as handle:
-        script = handle.read()
+    """Loads and execs the ReMakeFile script.
+    In graph cache mode, the context is restored from the cache when neither the script nor its imports changed."""
+    if isGraphCache() and loadGraph(configFile):
+        return
+
+    exec(compileScript(configFile))
+    getCurrentContext().prune()
 
-    exec(script)
+    # Contexts executing sub ReMakeFiles are not cached as their builds would be skipped.
+    # Modules imported before the script ran (e.g., by a parent ReMakeFile) may be used by it as well.
+    if isGraphCache() and not getCurrentContext().subDirs:
+        saveGraph(configFile, importedModules())
 
 
 @typechecked
 def generateDependencyList(targets: list[TYP_PATH_LOOSE] | None = None) -> TYP_DEP_LIST:
-    """Generates and sorts dependency list."""
+    """Generates and sorts dependency list.
+    In graph cache mode, builds reuse the list resolved by a previous run with the same rules and targets."""
     deps = []
     if targets is None:
         targets = getCurrentContext().targets
 
+    # Clean and dry runs resolve missing ground dependencies differently, only builds are cached.
+    useCache = isGraphCache() and not isClean() and not isDryRun()
+    if useCache:
+        cached = loadDeps(targets)
+        if cached is not None:
+            return cached
+
+    # Files may have changed since the last build, stats are then shared by all the graph.
+    clearStatCache()
+    cache = {}
     for target in targets:
-        deps += [findBuildPath(target)]
+        deps += [findBuildPath(target, cache)]
 
-    deps = sortDeps(deps)
-    deps = optimizeDeps(deps)
+    # Sorted nodes are already unique, only rules making several targets remain to be merged (see optimizeDeps).
+    deps = _mergeTargetsSameRule(sortDeps(deps))
+    if useCache:
+        saveDeps(targets, deps)
     return deps
 
 
-@typechecked
-def findBuildPath(target: TYP_PATH_LOOSE) -> TYP_DEP_GRAPH:
-    """Constructs dependency graph from registered rules."""
+def findBuildPath(target: TYP_PATH_LOOSE, cache: dict | None = None) -> TYP_DEP_GRAPH:
+    """Constructs dependency graph from registered rules.
+    Sub graphs already constructed for the same cache are reused (e.g., a dependency shared by several rules).
+    Dependencies are walked with an explicit stack, so that long chains of rules are not limited by recursion."""
+    if cache is None:
+        # New resolution, files may have changed since stats were cached (see generateDependencyList).
+        cache = {}
+        clearStatCache()
+    if target in cache:
+        if cache[target] is None:
+            raise ValueError(f"Circular dependency on {target}")
+        return cache[target]
+
+    # Targets being constructed are marked in the cache until their sub graph is known.
+    cache[target] = None
+    key, depNames = _findRule(target)
+    stack = [(target, key, depNames, iter(depNames))]
+    while stack:
+        current, key, depNames, remaining = stack[-1]
+        for dep in remaining:
+            if dep not in cache:
+                # Sub graph of dep is needed first.
+                cache[dep] = None
+                depKey, depDepNames = _findRule(dep)
+                stack += [(dep, depKey, depDepNames, iter(depDepNames))]
+                break
+            if cache[dep] is None:
+                raise ValueError(f"Circular dependency on {dep}")
+        else:
+            # All sub graphs are known.
+            stack.pop()
+            cache[current] = {key: [cache[dep] for dep in depNames]}
+
+    return cache[target]
+
+
+def _findRule(target):
+    """Returns the node of target in the dependency graph (matched target and rule) and the names of its
+    dependencies."""
     depNames = []
     foundRule = None
 
@@ -116,27 +204,33 @@ def findBuildPath(target: TYP_PATH_LOOSE) -> TYP_DEP_GRAPH:
     for context in reversed(getContexts()):
         # For each context, look for matching rules.
         namedRules, patternRules = context.rules
+        index = context.ruleIndex
+        if index is None:
+            index = context.ruleIndex = RuleIndex(namedRules, patternRules)
         matchedTarget = None
         # First with named rules that will directly match the target.
-        for rule in namedRules:
-            matchedTarget = rule.match(target)
+        if index.isNamedIndexed:
+            rule, matchedTarget = index.matchNamed(target)
             if matchedTarget:
                 # Target found in rule's target.
                 depNames += rule.deps
                 foundRule = rule
-                break
+        else:
+            for rule in namedRules:
+                matchedTarget = rule.match(target)
+                if matchedTarget:
+                    # Target found in rule's target.
+                    depNames += rule.deps
+                    foundRule = rule
+                    break
 
         # Stopping here as named rule was found.
         if foundRule is not None:
-            depNames = [findBuildPath(dep) for dep in depNames]
-            return {
-                (matchedTarget,
-                 foundRule): depNames
-            }
+            return ((matchedTarget, foundRule), depNames)
 
         foundRule = None
         # Then with pattern rules that are generic.
-        for rule in patternRules:
+        for rule in patternRules[index.firstPatternRule(target):]:
             matchedTarget, depNames = rule.match(target)
             if depNames:
                 # Since rule was an anonymous rule (with *),
@@ -146,34 +240,21 @@ def findBuildPath(target: TYP_PATH_LOOSE) -> TYP_DEP_GRAPH:
 
         # Stopping here as pattern rule was found.
         if foundRule is not None:
-            depNames = [findBuildPath(dep) for dep in depNames]
-            return {
-                (matchedTarget,
-                 foundRule): depNames
-            }
+            return ((matchedTarget, foundRule), depNames)
 
     # At this point, no rule was found for the target.
-    if os.path.exists(str(target)):
+    if exists(str(target)):
         # And target already exists.
         if isClean():
             # We are attempting to clean an existing target no linked to any rule.
             # We thus found a ground dependency that we really don't want to erase.
-            return {
-                (target,
-                 None): []
-            }
+            return ((target, None), [])
         elif isDryRun():
             # If we are in dry run mode, just assume it's OK.
-            return {
-                (target,
-                 None): []
-            }
+            return ((target, None), [])
         else:
             # If the file exists while in build mode, then job is done.
-            return {
-                (target,
-                 None): []
-            }
+            return ((target, None), [])
 
     else:
         if isClean():
@@ -183,134 +264,128 @@ def findBuildPath(target: TYP_PATH_LOOSE) -> TYP_DEP_GRAPH:
         elif isDryRun():
             # If we are in dry run mode, deps might not exist, just assume it's OK.
             ret = VirtualDep(target) if isinstance(target, str) else target
-            return {
-                (ret,
-                 None): []
-            }
+            return ((ret, None), [])
         elif isinstance(target, (VirtualTarget, VirtualDep)):
             # Target is virtual and is not supposed to be a file, just assume it's OK.
-            return {
-                (target,
-                 None): []
-            }
+            return ((target, None), [])
         else:
             # However, if in build mode, no rule was found to make target!
             Console().print(f"[[bold red]STOP[/]] No rule to make {target}")
             sys.exit(1)
 
 
-@typechecked
 def sortDeps(deps: List[TYP_DEP_GRAPH]) -> TYP_DEP_LIST:
     """Sorts dependency graph as a reverse level order list.
-    Snippet from: https://www.geeksforgeeks.org/reverse-level-order-traversal/"""
-    tmpQueue = deque()
-    ret = deque()
+    A node shared by several parents is expanded once per level and only kept at its deepest level."""
+    ret = {}
+
+    for dep in deps:
+        # Nodes of each level and their sub-dependencies, in order of their last occurrence in the level.
+        levels = []
+        level = dict(dep)
+        while level:
+            levels += [level]
+            nextLevel = {}
+            for values in level.values():
+                for ruleDep in values:
+                    (key, subValues), = ruleDep.items()
+                    nextLevel.pop(key, None)
+                    nextLevel[key] = subValues
+            level = nextLevel
+
+        # Deepest levels first, nodes already met (deeper or in a previous graph) keep their position.
+        for level in reversed(levels):
+            ret.update(dict.fromkeys(reversed(level)))
+
+    # Make each dependencies a list
+    return [([path], rule) for path, rule in ret]
 
-    # Start with last dep.
-    for dep in deps[::-1]:
-        tmpQueue.append(dep)
 
-        while tmpQueue:
-            node = tmpQueue.popleft()
-            key, values = list(node.items())[0]
-            path, rule = key
-
-            # Make each dependencies a list
-            ret.appendleft(([path], rule))
-
-            # And iterate for sub=dependencies
-            for ruleDep in values:
-                tmpQueue.append(ruleDep)
-
-    return list(ret)
-
-
-@typechecked
 def optimizeDeps(deps: TYP_DEP_LIST) -> TYP_DEP_LIST:
     """Removes rules from dependencies list """
-    def _mergeTargetsSameRule(origDeps: TYP_DEP_LIST) -> TYP_DEP_LIST:
-        """Remove duplicate calls to a rule that produces multiple dependencies."""
-        ret = []
-        if len(origDeps) < 2:
-            return origDeps
-
-        # We will remove items from deps as we process the list so let's make a copy first.
-        deps = origDeps.copy()
-
-        # Keep going as long a there are deps still not processed.
-        while len(deps) > 0:
-            # Iterates over the dependencies starting from the end to compare with left side of the array.
-            # First element is omitted since their is nothing to the left.
-            target = deps[-1]
-            lhsDeps = deps[:-1]
-
-            if target[1] is not None:
-                # If target is a tuple, there is a rule associated.
-                # Find all other targets that share the same rule.
-                otherTargets = list(filter(lambda _: _[1] == target[1], lhsDeps))
-                if otherTargets:
-                    # If there are other targets, merge them.
-                    allTargetsSameRule = list(chain.from_iterable([_[0] for _ in otherTargets])) + target[0]
-                    allTargetsSameRule = list(
-                        i for (n,
-                               i) in enumerate(allTargetsSameRule) if i not in allTargetsSameRule[:n]
-                    )
-                    ret += [(allTargetsSameRule, target[1])]
-                    for otherTarget in otherTargets:
-                        deps.remove(otherTarget)
-                else:
-                    ret += [target]
-            else:
-                ret += [target]
-            del deps[-1]
+    deps = _removeDuplicatesWithNoRules(deps)
+    deps = _mergeTargetsSameRule(deps)
+    return deps
 
-        ret = ret[::-1]  # And sort back the list to the correct order since we iterated from the end to the beginning.
-        return ret
 
-    def _removeDuplicatesWithNoRules(deps: TYP_DEP_LIST) -> TYP_DEP_LIST:
-        """Remove duplicate targets that have no associated rule."""
-        ret = []
-        if len(deps) < 2:
-            return deps
+def _mergeTargetsSameRule(deps: TYP_DEP_LIST) -> TYP_DEP_LIST:
+    """Remove duplicate calls to a rule that produces multiple dependencies.
+    All targets of a rule are merged (in order, without duplicates) where the rule last appears."""
+    if len(deps) < 2:
+        return deps
+
+    # Targets, number of occurrences and last position of each rule (rules are compared by value).
+    groups = {}
+    for i, (targets, rule) in enumerate(deps):
+        if rule is not None:
+            group = groups.setdefault(rule, [[], 0, None])
+            group[0] += targets
+            group[1] += 1
+            group[2] = i
+
+    ret = []
+    for i, (targets, rule) in enumerate(deps):
+        if rule is None:
+            ret += [(targets, rule)]
+            continue
+        allTargets, count, last = groups[rule]
+        if i == last:
+            if count > 1 and len(set(allTargets)) != len(allTargets):
+                # Targets are usually distinct, only build an ordered copy without duplicates when needed.
+                allTargets = list(dict.fromkeys(allTargets))
+            ret += [(allTargets, rule) if count > 1 else deps[i]]
+    return ret
 
-        for i in range(1, len(deps)):
-            # Iterates over the dependencies starting from the end to compare with left side of the array.
-            # First element is omitted since there is nothing to the left.
-            target = deps[-i]
-            lhsDeps = deps[:-i]
 
-            # Check if target appears multiple times in the list of dependencies (including if associated with a rule).
-            if target not in lhsDeps and target not in [_[0] for _ in lhsDeps if isinstance(_, tuple)]:
-                ret += [target]
+def _removeDuplicatesWithNoRules(deps: TYP_DEP_LIST) -> TYP_DEP_LIST:
+    """Remove duplicate targets that have no associated rule.
+    Only the first occurrence of identical (targets, rule) entries is kept."""
+    ret = []
+    seen = set()
+    for targets, rule in deps:
+        key = (tuple(targets), rule)
+        if key not in seen:
+            seen.add(key)
+            ret += [(targets, rule)]
+    return ret
 
-        ret = ret + [deps[0]]  # Put back the first target that was omitted above.
-        ret = ret[::-1]  # And sort back the list to the correct order since we iterated from the end to the beginning.
-        return ret
 
-    deps = _removeDuplicatesWithNoRules(deps)
-    deps = _mergeTargetsSameRule(deps)
-    return deps
+def _ignoreMissing(_, _2, excInfo):
+    """shutil.rmtree error handler ignoring entries already removed (e.g. by a concurrent clean job)."""
+    if not issubclass(excInfo[0], FileNotFoundError):
+        raise excInfo[1]
 
 
 @typechecked
 def cleanDeps(deps: TYP_DEP_LIST, configFile: str = "ReMakeFile") -> TYP_DEP_LIST:
     """Builds files marked as targets from their dependencies."""
-    def _cleanDep(target):
-        if os.path.exists(target):
+    def _cleanDep(job, target):
+        # One stat tells whether target exists and its type.
+        targetStat = cachedStat(target)
+        if targetStat is not None:
             progress.console.print(
                 f"[{job+1}/{len(deps)}] [[bold plum1]CLEAN[/bold plum1]] Cleaning dependency {target}."
             )
-            if target.is_file():
-                os.remove(target)
-            elif target.is_dir():
-                shutil.rmtree(target)
+            # Targets nested in a directory target may be removed concurrently by another job.
+            if stat.S_ISREG(targetStat.st_mode):
+                try:
+                    os.remove(target)
+                except FileNotFoundError:
+                    pass
+            elif stat.S_ISDIR(targetStat.st_mode):
+                shutil.rmtree(target, onerror=_ignoreMissing)
+            invalidateStat(target)
+
+    clearStatCache()
 
     with Progress() as progress:
         progress.console.print(
             f"[+] [green bold] Executing {configFile} for folder {getCurrentContext().cwd}.[/bold green]"
         )
         task = progress.add_task("ReMakeFile steps", total=len(deps))
-        for job, dep in enumerate(deps):
+
+        def _cleanJob(job):
+            dep = deps[job]
             target, rule = dep
             if rule is None:
                 # Ground dependency (tree leaf).
@@ -322,70 +397,97 @@ def cleanDeps(deps: TYP_DEP_LIST, configFile: str = "ReMakeFile") -> TYP_DEP_LIS
                     rule = rule.expand(dep[0])
 
                 for target in targets:
-                    _cleanDep(target)
+                    _cleanDep(job, target)
                 progress.advance(task)
 
+        # Removals mostly wait for the filesystem, independent targets are removed concurrently as rules are applied.
+        runJobs(deps, _cleanJob, getJobs())
+
     return deps
 
 
 @typechecked
 def buildDeps(deps: TYP_DEP_LIST, configFile: str = "ReMakeFile") -> TYP_DEP_LIST:
     """Builds files marked as targets from their dependencies."""
-    rulesApplied = []
+    clearStatCache()
+    # Run modes do not change during a build, read them once for all deps.
+    dryRun = isDryRun()
+    verbose = isVerbose()
+    rulesApplied = {}
+    # Existing ground dependencies, only reported one by one in verbose mode.
+    skipped = []
     with Progress() as progress:
         progress.console.print(
             f"[+] [green bold] Executing {configFile} for folder {getCurrentContext().cwd}.[/bold green]"
         )
         task = progress.add_task("ReMakeFile steps", total=len(deps))
-        for job, dep in enumerate(deps):
-            targets, rule = dep
+
+        # Bound once for all jobs.
+        printLine = progress.console.print
+        total = len(deps)
+
+        def _buildDep(job):
+            targets, rule = deps[job]
             if rule is None:
                 # Ground dependency (tree leaf).
                 for target in targets:
-                    if isDryRun():
-                        progress.console.print(
-                            f"[{job+1}/{len(deps)}] [[bold plum1]DRY-RUN[/bold plum1]] Dependency: {target}"
-                        )
-                    elif isinstance(target, pathlib.Path) and os.path.exists(target):
-                        progress.console.print(
-                            f"[{job+1}/{len(deps)}] [[bold plum1]SKIP[/bold plum1]] Dependency {target} already exists."
-                        )
+                    if dryRun:
+                        printLine(f"[{job+1}/{total}] [[bold plum1]DRY-RUN[/bold plum1]] Dependency: {target}")
+                    elif isinstance(target, pathlib.Path) and exists(target):
+                        skipped.append(target)
+                        if verbose:
+                            printLine(
+                                f"[{job+1}/{total}] [[bold plum1]SKIP[/bold plum1]] Dependency {target} already exists."
+                            )
                     elif isinstance(target, (VirtualTarget, VirtualDep)):
-                        progress.console.print(
-                            f"[{job+1}/{len(deps)}] [[bold plum1]SKIP[/bold plum1]] Virtual dependency: {target}"
-                        )
+                        skipped.append(target)
+                        if verbose:
+                            printLine(f"[{job+1}/{total}] [[bold plum1]SKIP[/bold plum1]] Virtual dependency: {target}")
                     else:
-                        progress.console.print(
+                        printLine(
                             f"[[red bold]FAILED[/red bold]] Unable to find build path for [light_slate_blue]{target}[/light_slate_blue]! Aborting!"
                         )
                         raise FileNotFoundError
             else:
                 # Dependency with a rule, need to apply the rule.
-                targets, rule = dep
                 rulesSuccess = []
+                # Named rules are the same for all their targets, their action is only described once.
+                isPattern = isinstance(rule, PatternRule)
+                actionName = None
+                targetRule = rule
                 for target in targets:
-                    if isinstance(rule, PatternRule):
-                        rule = rule.expand(target)
-
-                    if isDryRun():
-                        progress.console.print(
-                            f"[{job+1}/{len(deps)}] [[bold plum1]DRY-RUN[/bold plum1]] Dependency: {target} built with rule: {rule.actionName}"
+                    if isPattern:
+                        targetRule = rule.expand(target)
+                    if isPattern or actionName is None:
+                        actionName = targetRule.actionName
+
+                    if dryRun:
+                        printLine(
+                            f"[{job+1}/{total}] [[bold plum1]DRY-RUN[/bold plum1]] Dependency: {target} built with rule: {actionName}"
                         )
                     else:
-                        progress.console.print(f"[{job+1}/{len(deps)}] {rule.actionName}")
-                        res = rule.apply(progress)
+                        printLine(f"[{job+1}/{total}] {actionName}")
+                        res = targetRule.apply(progress)
                         rulesSuccess += [res]
 
                 # Keep track of the rules applied for return.
-                if isDryRun() or (rulesSuccess and all(rulesSuccess)):
-                    rulesApplied += [(targets, rule)]
+                if dryRun or (rulesSuccess and all(rulesSuccess)):
+                    rulesApplied[job] = (targets, targetRule)
             progress.advance(task)
 
-    return rulesApplied
+        # Dry runs only print, keep them sequential to preserve output order.
+        runJobs(deps, _buildDep, 1 if dryRun else getJobs())
+        if skipped and not verbose:
+            progress.console.print(
+                f"[[bold plum1]SKIP[/bold plum1]] {len(skipped)} dependencies already exist or are virtual."
+            )
 
+    return [rulesApplied[job] for job in sorted(rulesApplied)]
 
-def main():
-    """Main function of ReMake."""
+
+def _argParser():
+    """Returns the full command line parser of ReMake, used for help and whatever _parseArgs does not handle."""
+    import argparse
     argparser = argparse.ArgumentParser(prog="remake", description="ReMake is a make-like tool.")
     argparser.add_argument(
         "-v",
@@ -402,6 +504,19 @@ def main():
         "--clean",
         action="store_true",
     )
+    argparser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        nargs="?",
+        default=1,
+        const=os.cpu_count() or 1,
+    )
+    argparser.add_argument(
+        "-g",
+        "--graph-cache",
+        action="store_true",
+    )
     argparser.add_argument(
         "-f",
         "--config-file",
@@ -414,7 +529,69 @@ def main():
         nargs='*',
         default=argparse.SUPPRESS,
     )
-    args = argparser.parse_intermixed_args()
+    return argparser
+
+
+# Command line flags handled by _parseArgs and their attribute.
+_FLAGS = {
+    "-v": "verbose",
+    "--verbose": "verbose",
+    "-n": "dry_run",
+    "--dry-run": "dry_run",
+    "-c": "clean",
+    "--clean": "clean",
+    "-g": "graph_cache",
+    "--graph-cache": "graph_cache",
+}
+
+
+def _parseArgs(argv: list[str]) -> types.SimpleNamespace | None:
+    """Parses the usual command lines as _argParser does, without importing and running argparse.
+    Returns None for anything else (e.g., help, abbreviations, combined or invalid options)."""
+    args = types.SimpleNamespace(
+        verbose=False,
+        dry_run=False,
+        clean=False,
+        jobs=1,
+        graph_cache=False,
+        config_file="ReMakeFile",
+        targets=[],
+    )
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        i += 1
+        if not arg.startswith("-"):
+            args.targets += [arg]
+        elif arg in _FLAGS:
+            setattr(args, _FLAGS[arg], True)
+        elif arg in ("-j", "--jobs"):
+            if i < len(argv) and not argv[i].startswith("-"):
+                if not argv[i].isdigit():
+                    return None
+                args.jobs = int(argv[i])
+                i += 1
+            else:
+                args.jobs = os.cpu_count() or 1
+        elif arg in ("-f", "--config-file") and i < len(argv) and not argv[i].startswith("-"):
+            args.config_file = argv[i]
+            i += 1
+        else:
+            return None
+
+    if not args.targets:
+        args.targets = None
+    return args
+
+
+def main():
+    """Main function of ReMake."""
+    args = _parseArgs(sys.argv[1:])
+    if args is None:
+        args = _argParser().parse_intermixed_args()
+        # Handling target.
+        if "targets" not in args:
+            args.targets = None
 
     # Global arguments handling.
     if args.verbose:
@@ -427,9 +604,12 @@ def main():
     if args.clean:
         setClean()
 
-    # Handling target.
-    if "targets" not in args:
-        args.targets = None
+    # Graph cache handling.
+    if args.graph_cache:
+        setGraphCache()
+
+    # Parallel build handling.
+    setJobs(args.jobs)
 
     executeReMakeFileFromDirectory(os.getcwd(), configFile=args.config_file, targets=args.targets)
 
@@ -2,10 +2,13 @@
 # -*- coding: utf-8 -*-
 """Path handling classes of ReMake."""
 
+import errno
 import os
 import pathlib
+import shutil
+import stat
 
-from typeguard import typechecked
+from remake.typecheck import typechecked
 
 
 @typechecked()
@@ -87,7 +90,8 @@ def shouldRebuild(target: VirtualTarget | pathlib.Path, deps: list[VirtualDep |
         # Target is virtual, always rebuild.
         return True
 
-    if not os.path.exists(target):
+    targetStat = cachedStat(target)
+    if targetStat is None:
         # If target does not already exists.
         return True
 
@@ -96,7 +100,10 @@ def shouldRebuild(target: VirtualTarget | pathlib.Path, deps: list[VirtualDep |
         if isinstance(dep, VirtualDep):
             # Dependency is virtual, nothing to compare to, skip to next dep.
             continue
-        if os.path.getctime(dep) > os.path.getctime(target):
+        depStat = cachedStat(dep)
+        if depStat is None:
+            raise FileNotFoundError(f"Dependency {dep} does not exists")
+        if depStat.st_ctime > targetStat.st_ctime:
             # Dep was created after target, thus more recent, thus should rebuild.
             return True
 
@@ -104,6 +111,153 @@ def shouldRebuild(target: VirtualTarget | pathlib.Path, deps: list[VirtualDep |
     return False
 
 
+# Errors meaning that a kernel copy is not supported for these files (e.g., cross-filesystem on old kernels).
+KERNEL_COPY_ERRNOS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF)
+
+
+def _copyFileRange(fdIn, fdOut):
+    while os.copy_file_range(fdIn, fdOut, 1 << 30):
+        pass
+
+
+def _sendfile(fdIn, fdOut):
+    offset = 0
+    while sent := os.sendfile(fdOut, fdIn, offset, 1 << 30):
+        offset += sent
+
+
+def _copyFileObj(fdIn, fdOut):
+    with open(fdIn, "rb", closefd=False) as src, open(fdOut, "wb", closefd=False) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+
+
+def _copyData(fdIn, fdOut):
+    """Copies the content of fdIn into fdOut, inside the kernel when possible."""
+    copies = [copy for name, copy in (("copy_file_range", _copyFileRange), ("sendfile", _sendfile)) if hasattr(os, name)]
+    for copy in copies:
+        try:
+            copy(fdIn, fdOut)
+            return
+        except OSError as e:
+            if e.errno not in KERNEL_COPY_ERRNOS:
+                raise
+            # Start over with the next method.
+            os.lseek(fdIn, 0, os.SEEK_SET)
+            os.lseek(fdOut, 0, os.SEEK_SET)
+            os.ftruncate(fdOut, 0)
+    _copyFileObj(fdIn, fdOut)
+
+
+def _copyFile(src, dst, srcDirFd=None, dstDirFd=None):
+    """Copies src file content and mode to dst file, paths being relative to srcDirFd and dstDirFd if given."""
+    fdIn = os.open(src, os.O_RDONLY, dir_fd=srcDirFd)
+    try:
+        fdOut = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666, dir_fd=dstDirFd)
+        try:
+            _copyData(fdIn, fdOut)
+            os.fchmod(fdOut, stat.S_IMODE(os.fstat(fdIn).st_mode))
+        finally:
+            os.close(fdOut)
+    finally:
+        os.close(fdIn)
+
+
+def fastCopy(src: pathlib.Path | str, dst: pathlib.Path | str):
+    """Copies src file content and mode to dst, which may be a directory (same as shutil.copy).
+    Data is copied inside the kernel with copy_file_range (zero-copy, reflink on CoW filesystems) or sendfile when
+    available, through a userspace buffer otherwise."""
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src} and {dst} are the same file")
+
+    _copyFile(src, dst)
+    return dst
+
+
+def fastCopyAt(srcDirFd: int, dstDirFd: int, name: str) -> None:
+    """Same as fastCopy for file name of the directory opened as srcDirFd, into the directory opened as dstDirFd.
+    The name is resolved from the directories instead of walking their whole path again."""
+    _copyFile(name, name, srcDirFd, dstDirFd)
+
+
+def absolutePath(path: pathlib.Path | str, cwd: str | None = None) -> pathlib.Path:
+    """Same as pathlib.Path(path).absolute(), cwd being the current directory if already known by the caller
+    (e.g., to make many paths absolute with a single getcwd)."""
+    path = os.fspath(path)
+    if os.path.isabs(path):
+        return pathlib.Path(path)
+    return pathlib.Path(os.path.join(os.getcwd() if cwd is None else cwd, path))
+
+
+def walk(root: str):
+    """Yields the paths of all entries below root, without following links to directories.
+    Relies on scandir's cached entry types instead of stat'ing and allocating a Path per entry like rglob."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                yield entry.path
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+
+
+# Results of stat calls on dependencies and targets during a build, None if the path does not exist.
+STAT_CACHE = {}
+
+
+def cachedStat(path: pathlib.Path | str) -> os.stat_result | None:
+    """Returns the (cached) stat of path, None if it does not exist."""
+    key = os.fspath(path)
+    try:
+        return STAT_CACHE[key]
+    except KeyError:
+        pass
+
+    try:
+        ret = os.stat(key)
+    except (OSError, ValueError):
+        ret = None
+    STAT_CACHE[key] = ret
+    return ret
+
+
+def isFile(path: pathlib.Path | str) -> bool:
+    """Same as os.path.isfile but using the stat cache."""
+    st = cachedStat(path)
+    return st is not None and stat.S_ISREG(st.st_mode)
+
+
+def isDir(path: pathlib.Path | str) -> bool:
+    """Same as os.path.isdir but using the stat cache."""
+    st = cachedStat(path)
+    return st is not None and stat.S_ISDIR(st.st_mode)
+
+
+def exists(path: pathlib.Path | str) -> bool:
+    """Same as os.path.exists but using the stat cache."""
+    return cachedStat(path) is not None
+
+
+def invalidateStat(path: pathlib.Path | str) -> None:
+    """Forgets cached stats of path and everything below it, to be called once path is modified."""
+    key = os.fspath(path)
+    st = STAT_CACHE.pop(key, None)
+    if st is not None and not stat.S_ISDIR(st.st_mode):
+        # Was known as a file, nothing can be cached below it.
+        return
+
+    prefix = key.rstrip(os.sep) + os.sep
+    # Other threads may stat paths meanwhile, list(...) copies the keys at once.
+    for other in [other for other in list(STAT_CACHE) if other.startswith(prefix)]:
+        STAT_CACHE.pop(other, None)
+
+
+def clearStatCache() -> None:
+    """Forgets all cached stats, to be called when a build starts."""
+    STAT_CACHE.clear()
+
+
 TYP_TARGET = pathlib.Path | VirtualTarget | str
 TYP_DEP = pathlib.Path | VirtualDep | str
 TYP_PATH = pathlib.Path | VirtualTarget | VirtualDep
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Process spawning helpers for ReMake."""
+
+import functools
+import os
+import shutil
+import subprocess
+
+
+@functools.lru_cache(maxsize=None)
+def _which(name: str, path: str | None) -> str | None:
+    return shutil.which(name, path=path)
+
+
+def _spawnArgs(args, kwargs):
+    """Adapts subprocess arguments so that CPython spawns the process with posix_spawn instead of fork+exec.
+    This requires an absolute executable and no fd closing (fds opened by python are non-inheritable anyway)."""
+    if not kwargs.get("shell") and isinstance(args, list) and args and not os.path.dirname(str(args[0])):
+        executable = _which(str(args[0]), os.environ.get("PATH"))
+        if executable is not None:
+            args = [executable] + args[1:]
+    kwargs.setdefault("close_fds", False)
+    return args, kwargs
+
+
+def run(args, **kwargs) -> subprocess.CompletedProcess:
+    """Same as subprocess.run, using posix_spawn when possible."""
+    args, kwargs = _spawnArgs(args, kwargs)
+    return subprocess.run(args, **kwargs)
+
+
+def popen(args, **kwargs) -> subprocess.Popen:
+    """Same as subprocess.Popen, using posix_spawn when possible."""
+    args, kwargs = _spawnArgs(args, kwargs)
+    return subprocess.Popen(args, **kwargs)
@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 """Rule handling classes of ReMake."""
 
+import fnmatch
+import json
 import os
 import pathlib
 import re
@@ -10,13 +12,16 @@ from remake.paths import TYP_DEP, TYP_PATH, TYP_PATH_LOOSE, TYP_TARGET
 
 from rich.progress import Progress
 from rich.console import Console
-from typeguard import typechecked
 from typing import Dict, List, Tuple, Union
 
+from remake.buildcache import getBuildCache
 from remake.context import getCurrentContext
 from remake.context import isDryRun
 from remake.builders import Builder
 from remake.paths import VirtualTarget, VirtualDep, GlobPattern, shouldRebuild
+from remake.paths import absolutePath, exists, invalidateStat, walk
+from remake.process import run
+from remake.typecheck import typechecked
 
 
 @typechecked()
@@ -99,7 +104,7 @@ class Rule():
 
     def _expandToAbsPath(self, filename: str | pathlib.Path) -> pathlib.Path:
         """Expands dep or target to absolute path."""
-        return pathlib.Path(filename).absolute()
+        return absolutePath(filename)
 
     def __eq__(self, other) -> bool:
         return other is not None and isinstance(other,
@@ -118,6 +123,11 @@ class Rule():
         Returns True if action was applied, False else.
         """
 
+        # Paths may have been modified since they were stat'ed (e.g., outside of a build).
+        for path in self._deps + self._targets:
+            if isinstance(path, pathlib.Path):
+                invalidateStat(path)
+
         # Check if rule is already applied (all targets are already made).
         if self._builder.shouldRebuild:
             # Either with custom shouldRebuild method.
@@ -131,36 +141,65 @@ class Rule():
         # If we are not in dry run mode, ensure dependencies were made before the rule is applied.
         if not isDryRun():
             for dep in self._deps:
-                if not isinstance(dep, VirtualDep) and not (os.path.isfile(dep) or os.path.isdir(dep)):
+                if not isinstance(dep, VirtualDep) and not exists(dep):
                     raise FileNotFoundError(f"Dependency {dep} does not exists to make {self._targets}")
 
-        # Apply the rule.
-        if self._builder.type == list:
-            subprocess.run(
-                " ".join(self.action),
-                shell=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=True,
-            )
-        else:
-            self._builder.action(self._deps, self._targets, console, **self._kwargs)
+        # Apply the rule, unless its targets can be restored from the build cache.
+        cacheKey = self._cacheKey()
+        if cacheKey is None or not getBuildCache().restore(cacheKey, self._targets):
+            if self._builder.type == list:
+                run(
+                    " ".join(self.action),
+                    shell=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    check=True,
+                )
+            else:
+                self._builder.action(self._deps, self._targets, console, **self._kwargs)
+
+        for target in self._targets:
+            if isinstance(target, pathlib.Path):
+                invalidateStat(target)
 
         # If we are not in dry run mode,
         if not isDryRun():
             if self._builder.isDestructive:
                 # If builder is destructive, ensure targets are properly destroyed.
                 for target in self._targets:
-                    if not isinstance(target, VirtualTarget) and (os.path.isfile(target) or os.path.isdir(target)):
+                    if not isinstance(target, VirtualTarget) and exists(target):
                         raise FileNotFoundError(f"Target {target} not destroyed by rule `{self.actionName}`")
             else:
                 # If builder is creative, ensure targets were made after the rule is applied.
                 for target in self._targets:
-                    if not isinstance(target, VirtualTarget) and not (os.path.isfile(target) or os.path.isdir(target)):
+                    if not isinstance(target, VirtualTarget) and not exists(target):
                         raise FileNotFoundError(f"Target {target} not created by rule `{self.actionName}`")
 
+        if cacheKey is not None:
+            getBuildCache().put(cacheKey, self._targets)
+
         return True
 
+    def _cacheKey(self) -> str | None:
+        """Returns the build cache key of the rule, None if the rule cannot be cached."""
+        if isDryRun() or not self._builder.isCacheable:
+            return None
+
+        if not all(isinstance(target, pathlib.Path) for target in self._targets):
+            return None
+
+        if self._builder.type == list:
+            action = self.action
+            action = [getBuildCache().toolFingerprint(action[0])] + action
+        else:
+            function = getBuildCache().functionFingerprint(self._builder.action)
+            if function is None:
+                return None
+            kwargs = json.dumps(self._kwargs, sort_keys=True, default=repr)
+            action = [function, kwargs] + [str(target) for target in self._targets]
+
+        return getBuildCache().key(action, self._deps)
+
     def match(self, other: TYP_PATH_LOOSE) -> TYP_PATH | None:
         """Returns True if other matches any target of the rule, False else."""
         for target in self._targets:
@@ -214,6 +253,11 @@ class Rule():
         """Return rule's dependencies."""
         return self._deps
 
+    @property
+    def builder(self) -> Builder:
+        """Return rule's builder."""
+        return self._builder
+
 
 @typechecked()
 class PatternRule(Rule):
@@ -295,14 +339,72 @@ class PatternRule(Rule):
     @property
     def allTargets(self) -> list[pathlib.Path]:
         """Returns all possible targets from globing possible dependencies."""
-        allDeps = []
-        for dep in self._deps:
-            allDeps += list(pathlib.Path(".").rglob(dep.pattern))
+        # Walk the tree once for all patterns, matching entry names as rglob does.
+        matches = {dep.pattern: [] for dep in self._deps}
+        for path in walk("."):
+            name = os.path.basename(path)
+            for pattern, paths in matches.items():
+                if fnmatch.fnmatchcase(name, pattern):
+                    paths += [path]
+        allDeps = [path for dep in self._deps for path in matches[dep.pattern]]
 
         suffix = self.targetPattern.replace("*", "")
         return [pathlib.Path(dep).with_suffix(suffix) for dep in allDeps]
 
 
+class RuleIndex():
+    """Lookup index of the rules of a context, answering as scanning the rules in order would.
+    Targets of all named rules are combined in one regex, each being a group, so that the first matching target is
+    found in one match. Pattern rules are prefiltered on the name of the target, only the rules from the first one
+    that may match are then checked."""
+    __slots__ = ("_namedTargets", "_namedRegex", "_patternRegex")
+
+    def __init__(self, namedRules: list[Rule], patternRules: list[PatternRule]):
+        self._namedTargets = [(rule, target) for rule in namedRules for target in rule.targets]
+        self._namedRegex = self._compile([str(target) for _, target in self._namedTargets])
+
+        # Path.match compares a pattern without separator to the last part of the path only.
+        self._patternRegex = self._compile(
+            [
+                fnmatch.translate(rule.targetPattern) if "/" not in rule.targetPattern else ".*"
+                for rule in patternRules
+            ]
+        )
+
+    @staticmethod
+    def _compile(patterns: list[str]) -> re.Pattern | None:
+        """Returns the alternation of patterns, None if they cannot be combined (e.g., they have groups of their own
+        that would be renumbered)."""
+        try:
+            if not patterns or any(re.compile(pattern).groups for pattern in patterns):
+                return None
+            return re.compile("|".join(f"({pattern})" for pattern in patterns))
+        except re.error:
+            return None
+
+    @property
+    def isNamedIndexed(self) -> bool:
+        """Returns True if named rules are looked up with matchNamed, False if they must be scanned."""
+        return self._namedRegex is not None
+
+    def matchNamed(self, other: TYP_PATH_LOOSE) -> tuple[Rule | None, TYP_PATH | None]:
+        """Returns the first named rule and its target matching other (as Rule.match does), (None, None) if none."""
+        match = self._namedRegex.fullmatch(str(other))
+        if match is None:
+            return (None, None)
+        return self._namedTargets[match.lastindex - 1]
+
+    def firstPatternRule(self, other: TYP_PATH_LOOSE) -> int:
+        """Returns the position of the first pattern rule that may match other, their number if none may match."""
+        if self._patternRegex is None or not isinstance(other, (str, pathlib.Path)):
+            return 0
+        parts = pathlib.Path(other).parts
+        if not parts:
+            return 0
+        match = self._patternRegex.match(parts[-1])
+        return match.lastindex - 1 if match is not None else self._patternRegex.groups
+
+
 #TYP_DEP_LIST = list[TYP_PATH | tuple[Union[TYP_PATH, List[TYP_PATH]], Rule]]
 TYP_DEP_LIST = list[tuple[list[TYP_PATH], Rule | None]]
 TYP_DEP_GRAPH = dict[tuple[TYP_PATH, Rule | None], list["TYP_DEP_GRAPH"]]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Scheduling of ReMake jobs on a pool of workers."""
+
+import heapq
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from remake.rules import TYP_DEP_LIST, PatternRule
+
+# Characters making a named rule target a regex rather than a plain path ('.' is too common in paths to count).
+REGEX_CHARS = frozenset("*+?[](){}|^$\\")
+
+
+def jobPrerequisites(deps: TYP_DEP_LIST) -> list[set[int]]:
+    """Returns, for each job of the dependency list, the set of jobs making its dependencies.
+    Only previous jobs are considered since the dependency list is already sorted in build order."""
+    producers = {}
+    # Named rules whose targets are regexes (e.g., b.*) are listed under the regex, not under the paths they make.
+    regexProducers = []
+    for job, (targets, rule) in enumerate(deps):
+        if rule is not None:
+            for target in targets:
+                # Compare strings because targets can be of multiple type (pathlib.Path, virtual).
+                producers.setdefault(str(target), job)
+            if not isinstance(rule, PatternRule) and any(REGEX_CHARS.intersection(str(_)) for _ in targets):
+                regexProducers += [(job, rule)]
+
+    ret = []
+    for job, (targets, rule) in enumerate(deps):
+        prerequisites = set()
+        if rule is not None:
+            for target in targets:
+                ruleDeps = rule.expand(target).deps if isinstance(rule, PatternRule) else rule.deps
+                for dep in ruleDeps:
+                    other = producers.get(str(dep))
+                    if other is not None and other < job:
+                        prerequisites.add(other)
+                    elif other is None:
+                        # Waiting for all regex rules making dep is safe, even if only one of them was resolved.
+                        prerequisites.update(
+                            other for other, otherRule in regexProducers if other < job and otherRule.match(dep)
+                        )
+        ret += [prerequisites]
+
+    return ret
+
+
+def computeChainDepth(dependents: list[list[int]]) -> list[int]:
+    """Returns, for each job, the length of the longest chain of jobs depending on it (itself included).
+    Dependents of a job always come after it, thus depths are computed from the last job to the first."""
+    depth = [1] * len(dependents)
+    for job in range(len(dependents) - 1, -1, -1):
+        if dependents[job]:
+            depth[job] = 1 + max(depth[other] for other in dependents[job])
+    return depth
+
+
+def runJobs(deps: TYP_DEP_LIST, run: Callable[[int], None], jobs: int = 1) -> None:
+    """Calls `run` with the index of each job of the dependency list.
+    Up to `jobs` jobs are run concurrently, a job being started once all jobs making its dependencies are done.
+    Rules mostly wait for subprocesses, thus threads are enough to run them concurrently.
+    Ready jobs heading the longest chains, then having the most dependents, are started first
+    so that the critical path of the build starts as early as possible."""
+    if jobs <= 1:
+        for job in range(len(deps)):
+            run(job)
+        return
+
+    prerequisites = jobPrerequisites(deps)
+    dependents = [[] for _ in deps]
+    for job, before in enumerate(prerequisites):
+        for other in before:
+            dependents[other] += [job]
+
+    depth = computeChainDepth(dependents)
+    priority = [(-depth[job], -len(dependents[job]), job) for job in range(len(deps))]
+
+    remaining = [len(before) for before in prerequisites]
+    ready = [priority[job] for job, count in enumerate(remaining) if count == 0]
+    heapq.heapify(ready)
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while ready or running:
+            while ready and len(running) < jobs:
+                job = heapq.heappop(ready)[-1]
+                running[executor.submit(run, job)] = job
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                # Propagates failures, jobs that were not started yet will never be.
+                future.result()
+                for other in dependents[job]:
+                    remaining[other] -= 1
+                    if remaining[other] == 0:
+                        heapq.heappush(ready, priority[other])
@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Optional runtime type checking of ReMake's API."""
+
+import os
+
+# Type checks are disabled unless REMAKE_TYPECHECK=1 (the test suite enables them).
+TYPECHECK = os.environ.get("REMAKE_TYPECHECK", "0") != "0"
+
+if TYPECHECK:
+    from typeguard import typechecked
+else:
+    def typechecked(target=None, **_):
+        """No-op replacement of typeguard's typechecked, used as @typechecked or @typechecked()."""
+        if target is None:
+            return lambda target: target
+        return target
@@ -0,0 +1,8 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""ReMake test cases."""
+
+import os
+
+# API tests expect type errors, runtime type checks must be enabled before remake is imported.
+os.environ.setdefault("REMAKE_TYPECHECK", "1")
@@ -2,18 +2,24 @@
 # -*- coding: utf-8 -*-
 """Unit tests related to builders."""
 
+import errno
 import os
+import pickle
 import shutil
+import subprocess
 import tarfile
 import time
 import zipfile
 from pathlib import Path
+from unittest.mock import patch
 
 from ward import test, fixture, raises, skip
 
 from remake import Builder, Rule, VirtualDep, VirtualTarget
 from remake import getCurrentContext
-from remake.builders import cp, mv, rm, tar, zip
+from remake.buildcache import DigestCache, fileDigest
+from remake.builders import cp, mv, rm, tar, zip, tex2pdf, gcc
+from remake.paths import isFile, isDir, exists, invalidateStat, clearStatCache, fastCopy, walk, shouldRebuild
 
 TMP_FILE = "/tmp/remake.tmp"
 
@@ -85,6 +91,21 @@ def setupTestCopyMove():
         shutil.rmtree(test_dir_4)
 
 
+@fixture
+def setupBuildCache():
+    """Points the build cache to a temporary directory, restoring the environment afterwards."""
+    previous = os.environ.get("REMAKE_CACHE_DIR")
+    os.environ["REMAKE_CACHE_DIR"] = "/tmp/remake/cache"
+
+    yield
+
+    if previous is None:
+        del os.environ["REMAKE_CACHE_DIR"]
+    else:
+        os.environ["REMAKE_CACHE_DIR"] = previous
+    shutil.rmtree("/tmp/remake/cache", ignore_errors=True)
+
+
 @test("Builders can handle python functions")
 def test_01_builderPyFun():
     """Builders can handle python functions"""
@@ -186,6 +207,13 @@ def test_05_copyFileOperations(_=setupTestCopyMove):
     with open(destination, "r", encoding="utf-8") as f:
         content = f.read()
     assert content == "Another test file."
+
+    # Same content with a newer source, target is copied again and becomes up to date.
+    time.sleep(0.1)
+    source.touch()
+    _doCopy(source, destination)
+    clearStatCache()
+    assert shouldRebuild(destination.absolute(), [source.absolute()]) is False
     os.remove(destination)
 
     # Multiple files
@@ -765,6 +793,9 @@ def test_18_tarCompression(_=setupTestCopyMove):
     tarfile.open(test_archive_gz, "r:gz").close()
     tarfile.open(test_archive_bz2, "r:bz2").close()
     tarfile.open(test_archive_xz, "r:xz").close()
+    for archive, mode in ((test_archive_gz, "r:gz"), (test_archive_bz2, "r:bz2"), (test_archive_xz, "r:xz")):
+        with tarfile.open(archive, mode) as tarball:
+            assert tarball.extractfile(str(test_file_1)).read() == b"This is a test file."
 
     # Clean up
     shutil.rmtree(test_dir_1)
@@ -969,3 +1000,319 @@ def test_24_zipNonexistentSource(_=setupTestCopyMove):
 
     # Clean up (archive won't be created)
     assert not test_archive.exists()
+
+
+@test("Cacheable builders restore targets from the build cache")
+def test_25_builderCache(_=setupTestCopyMove, _cache=setupBuildCache):
+    """Cacheable builders restore targets from the build cache"""
+    source = Path("test_file_1.txt")
+    target = Path("cached_file.txt")
+    counter = Path("counter.txt")
+
+    builder = Builder(action=f"cp $^ $@ && echo run >> {counter.absolute()}", cacheable=True)
+    Rule(targets=target, deps=source, builder=builder).apply()
+    assert target.read_text(encoding="utf-8") == "This is a test file."
+
+    # Target is restored from cache, the action is not executed again.
+    os.remove(target)
+    Rule(targets=target, deps=source, builder=builder).apply()
+    assert target.read_text(encoding="utf-8") == "This is a test file."
+    assert counter.read_text(encoding="utf-8") == "run\n"
+
+    # Changing dependency content misses the cache.
+    os.remove(target)
+    source.write_text("Updated content.", encoding="utf-8")
+    Rule(targets=target, deps=source, builder=builder).apply()
+    assert target.read_text(encoding="utf-8") == "Updated content."
+    assert counter.read_text(encoding="utf-8") == "run\nrun\n"
+
+    # Clean up
+    getCurrentContext().clearRules()
+    os.remove(target)
+    os.remove(counter)
+
+
+@test("Fast copy keeps content and mode of files.")
+def test_26fastCopy(_=setupTestCopyMove):
+    """Fast copy keeps content and mode of files."""
+    source = Path("test_fast_copy.bin")
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    with open(source, "wb") as f:
+        f.write(data)
+    os.chmod(source, 0o750)
+
+    # Into a file, then into a directory.
+    for destination, copied in ((Path("test_dir_1/copied.bin"), Path("test_dir_1/copied.bin")),
+                                (Path("test_dir_2"), Path("test_dir_2") / source)):
+        fastCopy(source, destination)
+        with open(copied, "rb") as f:
+            assert f.read() == data
+        assert os.stat(copied).st_mode & 0o777 == 0o750
+        os.remove(copied)
+
+    # Falls back to sendfile, then to a userspace copy, when kernel copies are not supported.
+    crossDevice = OSError(errno.EXDEV, "Invalid cross-device link")
+    with patch("os.copy_file_range", side_effect=crossDevice):
+        fastCopy(source, "test_dir_1/copied.bin")
+        with patch("os.sendfile", side_effect=crossDevice):
+            fastCopy(source, "test_dir_2/copied.bin")
+    for copied in ("test_dir_1/copied.bin", "test_dir_2/copied.bin"):
+        with open(copied, "rb") as f:
+            assert f.read() == data
+        os.remove(copied)
+
+    # Copying a file onto itself must not truncate it.
+    with raises(shutil.SameFileError):
+        fastCopy(source, source)
+    assert os.path.getsize(source) == len(data)
+    os.remove(source)
+
+
+@test("Many sibling files are copied at once.")
+def test_27_copyManyFiles(_=setupTestCopyMove):
+    """Many sibling files are copied at once."""
+    os.makedirs("test_dir_3/many", exist_ok=True)
+    sources = []
+    for i in range(100):
+        source = Path(f"test_dir_3/many/file_{i}.txt")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(f"File {i}.")
+        sources += [source]
+    os.chmod(sources[0], 0o750)
+
+    getCurrentContext().clearRules()
+    Rule(deps=sources, targets="test_dir_4", builder=cp).apply()
+    getCurrentContext().clearRules()
+    for i, source in enumerate(sources):
+        with open(Path("test_dir_4") / source.name, "r", encoding="utf-8") as f:
+            assert f.read() == f"File {i}."
+    assert os.stat(Path("test_dir_4") / sources[0].name).st_mode & 0o777 == 0o750
+
+
+@test("LaTeX passes stop once cross-references are stable.")
+def test_28_tex2pdfPasses(_=setupTestCopyMove):
+    """LaTeX passes stop once cross-references are stable."""
+    # Fake LaTeX compiler counting its passes and writing a constant .aux file.
+    fakeLatex = Path("fake_latex.sh").absolute()
+    with open(fakeLatex, "w", encoding="utf-8") as f:
+        f.write('#!/bin/sh\n'
+                'for arg; do job=$(basename "$arg"); done\n'
+                'echo x >> passes\n'
+                'echo "\\relax" > "$job.aux"\n'
+                'case " $* " in *" -draftmode "*) ;; *) touch "$job.pdf";; esac\n')
+    os.chmod(fakeLatex, 0o755)
+    with open("doc.tex", "w", encoding="utf-8") as f:
+        f.write("\\documentclass{article}\\begin{document}Hello\\end{document}")
+
+    def _countPasses():
+        getCurrentContext().clearRules()
+        Rule(deps="doc.tex", targets="doc.pdf", builder=tex2pdf, cmd=str(fakeLatex), useLatexmk=False).apply()
+        getCurrentContext().clearRules()
+        with open("passes", "r", encoding="utf-8") as f:
+            ret = len(f.readlines())
+        os.remove("passes")
+        return ret
+
+    # A fresh build needs a second pass to check the .aux file, an incremental one does not.
+    assert _countPasses() == 2
+    time.sleep(0.1)
+    Path("doc.tex").touch()
+    assert _countPasses() == 1
+
+    # With latexmk, passes are left to it.
+    fakeLatexmk = Path("fake_latexmk.sh").absolute()
+    with open(fakeLatexmk, "w", encoding="utf-8") as f:
+        f.write('#!/bin/sh\necho "$@" > latexmk_args\ntouch doc.pdf\n')
+    os.chmod(fakeLatexmk, 0o755)
+    time.sleep(0.1)
+    Path("doc.tex").touch()
+    with patch("remake.builders.LATEXMK", str(fakeLatexmk)):
+        getCurrentContext().clearRules()
+        Rule(deps="doc.tex", targets="doc.pdf", builder=tex2pdf, cmd="lualatex").apply()
+        getCurrentContext().clearRules()
+    with open("latexmk_args", "r", encoding="utf-8") as f:
+        assert f.read().split() == ["-pdf", "-pdflatex=lualatex", "%O", "%S", "-interaction=batchmode", "-halt-on-error",
+            str(Path("doc").absolute())]
+
+    for f in (fakeLatex, fakeLatexmk, "latexmk_args", "doc.tex", "doc.aux", "doc.pdf"):
+        os.remove(f)
+
+
+@test("Builders are specialized by action kind and survive pickling.")
+def test_29_builderSpecialization():
+    """Builders are specialized by action kind and survive pickling."""
+    shellBuilder = Builder(action="Magically creating $@ from $^", ephemeral=True)
+    assert isinstance(shellBuilder, Builder) and shellBuilder.type == list
+    assert cp.type != list
+    assert shellBuilder != Builder(action="Magically creating $@", ephemeral=True)
+    assert shellBuilder.action is Builder(action=["Magically", "creating", "$@", "from", "$^"], ephemeral=True).action
+
+    for builder in (shellBuilder, cp):
+        copied = pickle.loads(pickle.dumps(builder))
+        assert type(copied) is type(builder)
+        assert copied == builder and hash(copied) == hash(builder)
+    assert pickle.loads(pickle.dumps(shellBuilder)).parseAction([Path("a")], [Path("b")]) == ["Magically", "creating", Path("b"), "from", Path("a")]
+
+    # Subclasses of Builder are not specialized but handle both kinds of actions.
+    class MyBuilder(Builder):
+        pass
+
+    myShellBuilder = MyBuilder(action="Magically creating $@ from $^", ephemeral=True)
+    assert type(myShellBuilder) is MyBuilder and myShellBuilder == shellBuilder
+    assert myShellBuilder.parseAction([Path("a")], [Path("b")]) == ["Magically", "creating", Path("b"), "from", Path("a")]
+    myFunctionBuilder = MyBuilder(action=cp.action, ephemeral=True)
+    assert myFunctionBuilder.type != list and myFunctionBuilder.parseAction([], []) is cp.action
+
+
+@test("Stats are cached until invalidated.")
+def test_30_statCache(_=setupTestCopyMove):
+    """Stats are cached until invalidated."""
+    clearStatCache()
+    test_file_3 = Path("test_dir_1/test_file_3.txt").absolute()
+    assert isFile(test_file_3) and isDir(test_file_3.parent)
+
+    # Cached stats are stale until the path (or a parent directory) is invalidated.
+    os.remove(test_file_3)
+    assert isFile(test_file_3)
+    invalidateStat(test_file_3.parent)
+    assert not exists(test_file_3)
+    clearStatCache()
+
+
+@test("Digests of unchanged files are read from the digest cache.")
+def test_31_digestCache(_=setupTestCopyMove):
+    """Digests of unchanged files are read from the digest cache."""
+    cache = DigestCache("/tmp/remake/hashes.sqlite")
+    source = Path("test_file_1.txt")
+    past = time.time() - 60
+    os.utime(source, (past, past))
+    time.sleep(0.01)
+
+    # Files changed recently are hashed but not stored (their ctime is recent).
+    assert cache.digest(source) == fileDigest(source)
+    cache._connect().execute("UPDATE digests SET digest = ?", (b"stored", ))
+    assert cache.digest(source) == fileDigest(source)
+
+    # Old enough files are stored and reused until they change.
+    with patch("remake.buildcache.RACY_DELAY", 0):
+        cache.digest(source)
+        cache._connect().execute("UPDATE digests SET digest = ?", (b"stored", ))
+        assert cache.digest(source) == b"stored"
+        source.write_text("Updated content.", encoding="utf-8")
+        assert cache.digest(source) == fileDigest(source)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(f"/tmp/remake/hashes.sqlite{suffix}"):
+            os.remove(f"/tmp/remake/hashes.sqlite{suffix}")
+
+
+@test("Tar archives are the same with GNU tar and tarfile.")
+def test_32_tarFallback(_=setupTestCopyMove):
+    """Tar archives are the same with GNU tar and tarfile."""
+    def _tarMembers(compression):
+        getCurrentContext().clearRules()
+        Rule(deps=["test_dir_1", "test_file_2.txt"], targets="archive.tar", builder=tar, compression=compression).apply()
+        getCurrentContext().clearRules()
+        with tarfile.open("archive.tar", encoding="utf-8") as tarball:
+            ret = {member.name: (tarball.extractfile(member).read() if member.isfile() else None) for member in tarball}
+        os.remove("archive.tar")
+        return ret
+
+    for compression in ("", "xz"):
+        members = _tarMembers(compression)
+        with patch("remake.builders._gnuTar", return_value=None):
+            assert _tarMembers(compression) == members
+        assert members["test_dir_1/test_file_3.txt"] == b"Another other test file."
+
+
+@test("Zip archives are reproducible.")
+def test_33_zipReproducible(_=setupTestCopyMove):
+    """Zip archives are reproducible."""
+    def _doZip():
+        getCurrentContext().clearRules()
+        Rule(deps="test_dir_1", targets="archive.zip", builder=zip).apply()
+        getCurrentContext().clearRules()
+        with open("archive.zip", "rb") as f:
+            ret = f.read()
+        os.remove("archive.zip")
+        return ret
+
+    with open("test_dir_1/image.png", "wb") as f:
+        f.write(b"\x89PNG" * 100)
+    first = _doZip()
+    time.sleep(0.1)
+    Path("test_dir_1/test_file_3.txt").touch()
+    assert _doZip() == first
+
+    # Members read ahead by workers are written as if streamed while writing.
+    with patch("remake.builders.ZIP_READ_MAX_SIZE", -1):
+        assert _doZip() == first
+
+    # Already compressed members are stored, others are deflated.
+    with open("archive.zip", "wb") as f:
+        f.write(first)
+    with zipfile.ZipFile("archive.zip") as zipball:
+        assert zipball.getinfo("test_dir_1/image.png").compress_type == zipfile.ZIP_STORED
+        assert zipball.getinfo("test_dir_1/test_file_3.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert zipball.namelist() == sorted(zipball.namelist())
+    os.remove("archive.zip")
+
+
+@test("Cacheable python function builders restore targets from the build cache")
+def test_34_builderCacheFunction(_=setupTestCopyMove, _cache=setupBuildCache):
+    """Cacheable python function builders restore targets from the build cache"""
+    source = Path("test_file_1.txt")
+    target = Path("cached_file.txt")
+    calls = []
+
+    def _upper(deps, targets, _, suffix=""):
+        calls.append(targets[0])
+        targets[0].write_text(deps[0].read_text(encoding="utf-8").upper() + suffix, encoding="utf-8")
+
+    builder = Builder(action=_upper, cacheable=True)
+    for suffix in ("", "", "!"):
+        Rule(targets=target, deps=source, builder=builder, suffix=suffix).apply()
+        assert target.read_text(encoding="utf-8") == "THIS IS A TEST FILE." + suffix
+        os.remove(target)
+
+    # Second application is restored from cache, changing kwargs misses it.
+    assert len(calls) == 2
+
+    # Clean up
+    getCurrentContext().clearRules()
+
+
+@test("Directory copies are the same as shutil.copytree.")
+def test_35_copyTree(_=setupTestCopyMove):
+    """Directory copies are the same as shutil.copytree."""
+    os.makedirs("test_dir_1/sub/subsub")
+    with open("test_dir_1/sub/subsub/script.sh", "w", encoding="utf-8") as f:
+        f.write("#!/bin/sh\n")
+    os.chmod("test_dir_1/sub/subsub/script.sh", 0o750)
+    os.symlink("../test_dir_2", "test_dir_1/link_to_dir_2")
+    with open("test_dir_2/linked_file.txt", "w", encoding="utf-8") as f:
+        f.write("Linked file.")
+
+    Rule(deps="test_dir_1", targets="test_dir_3", builder=cp).apply()
+    getCurrentContext().clearRules()
+    shutil.copytree("test_dir_1", "test_dir_4/test_dir_1")
+
+    def _tree(root):
+        return sorted((os.path.relpath(path, root), os.lstat(path).st_mode) for path in walk(root))
+
+    assert _tree("test_dir_3/test_dir_1") == _tree("test_dir_4/test_dir_1")
+    with open("test_dir_3/test_dir_1/link_to_dir_2/linked_file.txt", "r", encoding="utf-8") as f:
+        assert f.read() == "Linked file."
+
+
+@test("C builders compile their dependencies.")
+@skip("gcc is not installed", when=shutil.which("gcc") is None)
+def test_36_gcc(_=setupTestCopyMove):
+    """C builders compile their dependencies."""
+    with open("hello.c", "w", encoding="utf-8") as f:
+        f.write("int main(void) { return 42; }\n")
+    Rule(deps="hello.c", targets="hello", builder=gcc, cflags="-O2 -Wall").apply()
+    getCurrentContext().clearRules()
+    assert subprocess.run(["./hello"], check=False).returncode == 42
+
+    for f in ("hello.c", "hello"):
+        os.remove(f)
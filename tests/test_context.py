@@ -4,12 +4,14 @@
 
 import pathlib
 
-from ward import test
+from ward import test, raises
 
 from remake import setVerbose, unsetVerbose, isVerbose
 from remake import setDryRun, unsetDryRun, isDryRun
 from remake import setDevTest, unsetDevTest, isDevTest
 from remake import setClean, unsetClean, isClean
+from remake import setJobs, getJobs
+from remake import Builder, Rule
 from remake.context import getCurrentContext
 from remake.main import AddTarget, AddVirtualTarget
 from remake.paths import VirtualTarget
@@ -71,8 +73,19 @@ def test_08_unsetClean():
     assert isClean() is False
 
 
+@test("setJobs sets JOBS")
+def test_09_setJobs():
+    """setJobs sets JOBS"""
+    setJobs(4)
+    assert getJobs() == 4
+    setJobs(1)
+    assert getJobs() == 1
+    with raises(ValueError):
+        setJobs(0)
+
+
 @test("AddTarget adds targets")
-def test_09_addTarget():
+def test_10_addTarget():
     """AddTarget adds targets"""
     # One target.
     AddTarget("a")
@@ -88,3 +101,18 @@ def test_09_addTarget():
     AddVirtualTarget("a")
     assert getCurrentContext().targets == [VirtualTarget(_) for _ in ("a")]
     getCurrentContext().clearTargets()
+
+
+@test("prune drops builders unused by rules")
+def test_11_prune():
+    """prune drops builders unused by rules"""
+    context = getCurrentContext()
+    context.clearBuilders()
+    usedBuilder = Builder(action="Magically creating $@ from $<")
+    Builder(action="Unused builder")
+    rule = Rule(targets="a", deps="b", builder=usedBuilder)
+    assert len(context.builders) == 2
+    context.prune()
+    assert len(context.builders) == 1 and context.builders[0] is rule.builder
+    context.clearBuilders()
+    context.clearRules()
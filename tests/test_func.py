@@ -10,7 +10,8 @@ from ward import test, raises, fixture
 
 from remake import Builder, Rule, PatternRule, AddTarget, VirtualTarget, VirtualDep
 from remake import findBuildPath, buildDeps, cleanDeps, generateDependencyList, getCurrentContext
-from remake import setDryRun, setDevTest, unsetDryRun, unsetDevTest
+from remake import setDryRun, setDevTest, unsetDryRun, unsetDevTest, setJobs
+from remake.main import _argParser, _parseArgs
 
 TMP_FILE = "/tmp/remake.tmp"
 
@@ -543,3 +544,112 @@ def test_08_cleanDependencies(_=ensureCleanContext, _2=ensureEmptyTmp):
     assert os.path.isfile(TMP_FILE)
     assert cleanDeps(generateDependencyList()) == [([pathlib.Path(TMP_FILE)], r_1)]
     assert not os.path.isfile(TMP_FILE)
+
+
+@test("Independent rules can be applied concurrently")
+def test_09_parallelBuild(_=ensureCleanContext, _2=ensureEmptyTmp):
+    """Independent rules can be applied concurrently"""
+
+    os.mkdir("/tmp/remake_subdir")
+    os.chdir("/tmp/remake_subdir")
+    setJobs(4)
+    slowBuilder = Builder(action="sleep 0.2 && touch $@")
+    r_1 = Rule(targets="a", deps=["b", "c"], builder=slowBuilder)
+    r_2 = Rule(targets="b", deps="d", builder=slowBuilder)
+    r_3 = Rule(targets="c", builder=slowBuilder)
+    r_4 = Rule(targets="d", builder=slowBuilder)
+    AddTarget("a")
+    deps = generateDependencyList()
+    try:
+        rulesApplied = buildDeps(deps)
+    finally:
+        setJobs(1)
+
+    # Rules are reported in build order and dependencies are made before their targets.
+    assert rulesApplied == [_ for _ in deps if _[1] is not None]
+    assert sorted(rulesApplied, key=lambda _: _[1].targets[0].stat().st_mtime_ns) in (
+        [([pathlib.Path("/tmp/remake_subdir/c")], r_3), ([pathlib.Path("/tmp/remake_subdir/d")], r_4),
+         ([pathlib.Path("/tmp/remake_subdir/b")], r_2), ([pathlib.Path("/tmp/remake_subdir/a")], r_1)],
+        [([pathlib.Path("/tmp/remake_subdir/d")], r_4), ([pathlib.Path("/tmp/remake_subdir/c")], r_3),
+         ([pathlib.Path("/tmp/remake_subdir/b")], r_2), ([pathlib.Path("/tmp/remake_subdir/a")], r_1)],
+    )
+
+
+@test("Long chains of rules are resolved and cycles are reported")
+def test_10_longChainsAndCycles(_=ensureCleanContext):
+    """Long chains of rules are resolved and cycles are reported"""
+
+    setDryRun()
+    os.chdir("/tmp")
+    fooBuilder = Builder(action="Magically creating $@ from $<")
+
+    # Deeper than the default recursion limit.
+    for i in range(2000):
+        Rule(targets=f"chain_{i}", deps=f"chain_{i + 1}", builder=fooBuilder)
+    graph = findBuildPath(pathlib.Path("/tmp/chain_0"))
+    depth = 0
+    while graph:
+        (key, values), = graph.items()
+        graph = values[0] if values else None
+        depth += 1
+    assert depth == 2001
+    assert key == (pathlib.Path("/tmp/chain_2000"), None)
+    getCurrentContext().clearRules()
+
+    Rule(targets="a", deps="b", builder=fooBuilder)
+    Rule(targets="b", deps="a", builder=fooBuilder)
+    with raises(ValueError):
+        findBuildPath(pathlib.Path("/tmp/a"))
+
+
+@test("Usual command lines are parsed as with argparse")
+def test_11_parseArgs():
+    """Usual command lines are parsed as with argparse"""
+
+    for argv in ([], ["-v", "a"], ["a", "-n", "b"], ["-j"], ["-j", "4", "a"], ["-g", "-f", "Other", "-c"]):
+        expected = vars(_argParser().parse_intermixed_args(argv))
+        expected.setdefault("targets", None)
+        assert vars(_parseArgs(argv)) == expected
+
+    # Anything else is left to argparse.
+    for argv in (["-vn"], ["--help"], ["-j4"], ["--verb"], ["-f"]):
+        assert _parseArgs(argv) is None
+
+
+@test("Files created between two resolutions are found")
+def test_12_findBuildPathNewFile(_=ensureCleanContext, _2=ensureEmptyTmp):
+    """Files created between two resolutions are found"""
+
+    with raises(SystemExit):
+        findBuildPath(pathlib.Path(TMP_FILE))
+    pathlib.Path(TMP_FILE).touch()
+    try:
+        assert findBuildPath(pathlib.Path(TMP_FILE)) == {(pathlib.Path(TMP_FILE), None): []}
+    finally:
+        os.remove(TMP_FILE)
+
+
+@test("Targets nested in a directory target are cleaned concurrently")
+def test_13_parallelCleanNested(_=ensureCleanContext, _2=ensureEmptyTmp):
+    """Targets nested in a directory target are cleaned concurrently"""
+
+    os.mkdir("/tmp/remake_subdir")
+    os.chdir("/tmp/remake_subdir")
+    names = [f"out/f{i}.txt" for i in range(20)]
+    Rule(targets="out", builder=Builder(action="mkdir -p $@"))
+    for name in names:
+        Rule(targets=name, builder=Builder(action="touch $@"))
+        AddTarget(name)
+    AddTarget("out")
+    deps = generateDependencyList()
+
+    setJobs(4)
+    try:
+        for _ in range(10):
+            os.mkdir("out")
+            for name in names:
+                pathlib.Path(name).touch()
+            cleanDeps(deps)
+            assert not os.path.exists("out")
+    finally:
+        setJobs(1)
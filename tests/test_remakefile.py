@@ -5,13 +5,17 @@
 import os
 import pathlib
 import shutil
+import sys
 import time
+from unittest.mock import patch
 
-from ward import test, fixture, skip
+from ward import test, fixture, raises, skip
 
 from remake import Builder, Rule, PatternRule, AddTarget, VirtualTarget
 from remake import executeReMakeFileFromDirectory, buildDeps, generateDependencyList, getCurrentContext, getOldContext
 from remake import setDryRun, setDevTest, unsetDryRun, unsetDevTest
+from remake import setGraphCache, unsetGraphCache
+from remake.context import popContext
 
 TMP_FILE = "/tmp/remake.tmp"
 
@@ -882,3 +886,134 @@ PatternRule(target="*.beta", deps="*.gamma", builder=touchBuilder)
     getCurrentContext().clearTargets()
 
     # TODO VirtualTarget
+
+
+@test("Graph cache restores ReMakeFile declarations without evaluating it")
+def test_13_graphCache(_=ensureCleanContext, _2=ensureEmptyTmp):
+    """Graph cache restores ReMakeFile declarations without evaluating it"""
+
+    ReMakeFile = """
+with open("/tmp/remake_graph_count", "a", encoding="utf-8") as handle:
+    handle.write("x")
+fooBuilder = Builder(action="Magically creating $@ from $<")
+Rule(targets="d", deps=["c", "a2", "b1"], builder=fooBuilder)
+PatternRule(target="*.foo", deps="*.bar", builder=fooBuilder)
+AddTarget("d")
+"""
+    os.environ["REMAKE_CACHE_DIR"] = "/tmp/remake_graph_cache"
+    shutil.rmtree("/tmp/remake_graph_cache", ignore_errors=True)
+    if os.path.exists("/tmp/remake_graph_count"):
+        os.remove("/tmp/remake_graph_count")
+    with open("/tmp/ReMakeFile", "w+", encoding="utf-8") as handle:
+        handle.write(ReMakeFile)
+
+    setDryRun()
+    setGraphCache()
+    try:
+        # First run evaluates the ReMakeFile, second one restores it from the cache.
+        contexts = []
+        for _ in range(2):
+            context = executeReMakeFileFromDirectory("/tmp")
+            contexts += [(context.rules, context.targets)]
+        with open("/tmp/remake_graph_count", "r", encoding="utf-8") as handle:
+            assert handle.read() == "x"
+        assert contexts[0] == contexts[1]
+
+        # Any change of the ReMakeFile invalidates the cache.
+        with open("/tmp/ReMakeFile", "a", encoding="utf-8") as handle:
+            handle.write("AddTarget(\"a\")\n")
+        context = executeReMakeFileFromDirectory("/tmp")
+        with open("/tmp/remake_graph_count", "r", encoding="utf-8") as handle:
+            assert handle.read() == "xx"
+        assert context.targets == [pathlib.Path("/tmp/d"), pathlib.Path("/tmp/a")]
+    finally:
+        unsetGraphCache()
+        del os.environ["REMAKE_CACHE_DIR"]
+        shutil.rmtree("/tmp/remake_graph_cache", ignore_errors=True)
+        os.remove("/tmp/remake_graph_count")
+
+
+@test("Graph cache reuses resolved dependencies while ground dependencies exist")
+def test_14_depsCache(_=ensureCleanContext, _2=ensureEmptyTmp):
+    """Graph cache reuses resolved dependencies while ground dependencies exist"""
+
+    ReMakeFile = """
+Rule(targets="remake_deps_b", deps="remake_deps_a", builder=Builder(action="cp $< $@"))
+AddTarget("remake_deps_b")
+"""
+    os.environ["REMAKE_CACHE_DIR"] = "/tmp/remake_graph_cache"
+    shutil.rmtree("/tmp/remake_graph_cache", ignore_errors=True)
+    with open("/tmp/ReMakeFile", "w+", encoding="utf-8") as handle:
+        handle.write(ReMakeFile)
+    pathlib.Path("/tmp/remake_deps_a").touch()
+
+    setGraphCache()
+    try:
+        context = executeReMakeFileFromDirectory("/tmp")
+        os.remove("/tmp/remake_deps_b")
+        with patch("remake.main.findBuildPath", side_effect=AssertionError):
+            cachedContext = executeReMakeFileFromDirectory("/tmp")
+        assert cachedContext.deps == context.deps
+        assert cachedContext.executedRules == context.executedRules
+        assert os.path.isfile("/tmp/remake_deps_b")
+
+        # A missing ground dependency is resolved again (and reported as such).
+        os.remove("/tmp/remake_deps_a")
+        with raises(SystemExit):
+            executeReMakeFileFromDirectory("/tmp")
+        popContext()
+    finally:
+        unsetGraphCache()
+        del os.environ["REMAKE_CACHE_DIR"]
+        shutil.rmtree("/tmp/remake_graph_cache", ignore_errors=True)
+        for f in ("/tmp/remake_deps_a", "/tmp/remake_deps_b"):
+            if os.path.exists(f):
+                os.remove(f)
+
+
+@test("Graph cache is invalidated by helper modules imported before the ReMakeFile")
+def test_15_graphCacheSharedModule(_=ensureCleanContext, _2=ensureEmptyTmp):
+    """Graph cache is invalidated by helper modules imported before the ReMakeFile"""
+
+    ReMakeFile = """
+import remake_graph_helper
+with open("/tmp/remake_graph_count", "a", encoding="utf-8") as handle:
+    handle.write("x")
+AddTarget(remake_graph_helper.TARGET)
+"""
+    os.environ["REMAKE_CACHE_DIR"] = "/tmp/remake_graph_cache"
+    shutil.rmtree("/tmp/remake_graph_cache", ignore_errors=True)
+    if os.path.exists("/tmp/remake_graph_count"):
+        os.remove("/tmp/remake_graph_count")
+    with open("/tmp/ReMakeFile", "w+", encoding="utf-8") as handle:
+        handle.write(ReMakeFile)
+    with open("/tmp/remake_graph_helper.py", "w+", encoding="utf-8") as handle:
+        handle.write("TARGET = \"a\"\n")
+
+    setDryRun()
+    setGraphCache()
+    sys.path.insert(0, "/tmp")
+    try:
+        # Helper is already imported (e.g., by a parent ReMakeFile) when the ReMakeFile imports it.
+        import remake_graph_helper
+        for _ in range(2):
+            executeReMakeFileFromDirectory("/tmp")
+        with open("/tmp/remake_graph_count", "r", encoding="utf-8") as handle:
+            assert handle.read() == "x"
+
+        # Any change of the helper invalidates the cache.
+        with open("/tmp/remake_graph_helper.py", "w", encoding="utf-8") as handle:
+            handle.write("TARGET = \"b\"\n")
+        del sys.modules["remake_graph_helper"]
+        context = executeReMakeFileFromDirectory("/tmp")
+        with open("/tmp/remake_graph_count", "r", encoding="utf-8") as handle:
+            assert handle.read() == "xx"
+        assert context.targets == [pathlib.Path("/tmp/b")]
+    finally:
+        unsetGraphCache()
+        sys.path.remove("/tmp")
+        sys.modules.pop("remake_graph_helper", None)
+        del os.environ["REMAKE_CACHE_DIR"]
+        shutil.rmtree("/tmp/remake_graph_cache", ignore_errors=True)
+        for f in ("/tmp/remake_graph_count", "/tmp/remake_graph_helper.py"):
+            os.remove(f)
@@ -10,6 +10,7 @@ from ward import test, fixture, raises
 
 from remake import Builder, Rule, PatternRule, VirtualDep, VirtualTarget, GlobPattern
 from remake import unsetDryRun, unsetDevTest, getCurrentContext
+from remake.rules import RuleIndex
 
 
 @fixture
@@ -308,4 +309,36 @@ def test_07_patternRulesExcludeTargets(_=ensureCleanContext):
     assert rule.match("test_b.foo") == (pathlib.Path("test_b.foo"), [])
 
 
+
+@test("Rule index matches as scanning rules in order")
+def test_08_ruleIndex(_=ensureCleanContext):
+    """Rule index matches as scanning rules in order"""
+
+    os.chdir("/tmp")
+    fooBuilder = Builder(action="Magically creating $@ from $^")
+    r_1 = Rule(targets=["a", "b"], deps="c", builder=fooBuilder)
+    r_2 = Rule(targets="b.*", deps="d", builder=fooBuilder)
+    Rule(targets="b.foo", deps="e", builder=fooBuilder)
+    r_4 = PatternRule(target="*.bar", deps="*.baz", builder=fooBuilder)
+    r_5 = PatternRule(target="*.foo", deps="*.baz", builder=fooBuilder)
+    namedRules, patternRules = getCurrentContext().rules
+    index = RuleIndex(namedRules, patternRules)
+
+    # First matching target of the first matching rule.
+    assert index.isNamedIndexed
+    assert index.matchNamed("/tmp/b") == (r_1, pathlib.Path("/tmp/b"))
+    assert index.matchNamed("/tmp/b.foo") == (r_2, pathlib.Path("/tmp/b.*"))
+    assert index.matchNamed("/tmp/c") == (None, None)
+
+    # Pattern rules before the first one that may match are skipped.
+    assert patternRules[index.firstPatternRule("/tmp/x.bar"):] == [r_4, r_5]
+    assert patternRules[index.firstPatternRule("/tmp/x.foo"):] == [r_5]
+    assert patternRules[index.firstPatternRule("/tmp/x.baz"):] == []
+
+    # Targets with groups of their own cannot be combined.
+    Rule(targets="(a)", deps="c", builder=fooBuilder)
+    namedRules, patternRules = getCurrentContext().rules
+    assert not RuleIndex(namedRules, patternRules).isNamedIndexed
+
+
 #     # Paths with ../ (all)
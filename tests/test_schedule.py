@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Unit tests related to scheduling."""
+
+import os
+
+from ward import test, fixture
+
+from remake import Builder, Rule, AddTarget, buildDeps, generateDependencyList, getCurrentContext
+from remake import setDryRun, unsetDryRun, setJobs
+from remake.schedule import jobPrerequisites, computeChainDepth
+
+
+@fixture
+def ensureCleanContext():
+    """Cleans rules and targets and unsets dry mode between tests."""
+
+    getCurrentContext().clearRules()
+    getCurrentContext().clearTargets()
+    yield
+    getCurrentContext().clearRules()
+    getCurrentContext().clearTargets()
+    unsetDryRun()
+
+
+@test("Jobs depend on the jobs making their dependencies")
+def test_01_jobPrerequisites(_=ensureCleanContext):
+    """Jobs depend on the jobs making their dependencies"""
+
+    setDryRun()
+    os.chdir("/tmp")
+    fooBuilder = Builder(action="Magically creating $@ from $<")
+    Rule(targets="a", deps=["b", "c"], builder=fooBuilder)
+    Rule(targets="b", deps="d", builder=fooBuilder)
+    Rule(targets="c", builder=fooBuilder)
+    AddTarget("a")
+    deps = generateDependencyList()
+    jobs = {str(targets[0]): job for job, (targets, _) in enumerate(deps)}
+    prerequisites = jobPrerequisites(deps)
+
+    assert prerequisites[jobs["/tmp/d"]] == set()
+    assert prerequisites[jobs["/tmp/c"]] == set()
+    assert prerequisites[jobs["/tmp/b"]] == set()  # d is a ground dependency, made by no job.
+    assert prerequisites[jobs["/tmp/a"]] == {jobs["/tmp/b"], jobs["/tmp/c"]}
+
+
+@test("Chain depth is the length of the longest chain of dependents")
+def test_02_computeChainDepth():
+    """Chain depth is the length of the longest chain of dependents"""
+
+    # 0 -> 2 -> 3, 1 -> 3, 4 alone.
+    dependents = [[2], [3], [3], [], []]
+    assert computeChainDepth(dependents) == [3, 2, 2, 1, 1]
+
+
+@test("Jobs depend on named rules with regex targets making their dependencies")
+def test_03_jobPrerequisitesRegexTarget(_=ensureCleanContext):
+    """Jobs depend on named rules with regex targets making their dependencies"""
+
+    os.makedirs("/tmp/remake_regex", exist_ok=True)
+    os.chdir("/tmp/remake_regex")
+    for f in ("a", "b.foo", "b.*"):
+        if os.path.exists(f):
+            os.remove(f)
+    # The regex target itself is also created, as rules check that their targets exist once applied.
+    Rule(targets="b.*", builder=Builder(action="sleep 0.5 && touch b.foo \"b.*\""))
+    Rule(targets="a", deps="b.foo", builder=Builder(action="touch $@"))
+    AddTarget("a")
+    deps = generateDependencyList()
+    assert jobPrerequisites(deps) == [set(), {0}]
+
+    # Rule making a is only applied once b.foo was made, even with concurrent jobs.
+    setJobs(4)
+    try:
+        buildDeps(deps)
+    finally:
+        setJobs(1)
+    assert os.path.isfile("/tmp/remake_regex/a")